@@ -0,0 +1,19 @@
+import tempfile
+from pathlib import Path
+
+import nonebot
+
+
+def load_plugin():
+    # plugin refuses default localstore paths, use a throwaway directory instead
+    root = Path(tempfile.mkdtemp(prefix="picstatus-benchmarks-"))
+    nonebot.init(
+        localstore_cache_dir=root / "cache",
+        localstore_config_dir=root / "config",
+        localstore_data_dir=root / "data",
+    )
+    nonebot.require("nonebot_plugin_picstatus")
+
+    from nonebot_plugin_picstatus.collectors import load_builtin_collectors
+
+    load_builtin_collectors()
@@ -0,0 +1,127 @@
+"""
+run every registered collector against a simulated host
+
+    python -m benchmarks [--processes 20000] [--mounts 300] [--nics 500]
+                         [--rounds 5] [--budget benchmarks/budget.json]
+
+exits with code 1 when any collector exceeds its budget
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any
+
+from . import load_plugin
+from .fake_psutil import FakeHost
+
+DEFAULT_BUDGET_PATH = Path(__file__).parent / "budget.json"
+# collectors that touch network or depend on a running bot
+DEFAULT_SKIP = ["network_connection"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--processes", type=int, default=20000)
+    parser.add_argument("--mounts", type=int, default=300)
+    parser.add_argument("--nics", type=int, default=500)
+    parser.add_argument("--disks", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--budget", type=Path, default=DEFAULT_BUDGET_PATH)
+    parser.add_argument("--skip", nargs="*", default=DEFAULT_SKIP)
+    parser.add_argument("--only", nargs="*", default=None)
+    return parser.parse_args()
+
+
+async def call_once(instance: Any):
+    from nonebot_plugin_picstatus.collectors import BasePeriodicCollector
+
+    if isinstance(instance, BasePeriodicCollector):
+        await instance.collect()
+    else:
+        await instance.get()
+
+
+async def bench_one(name: str, rounds: int) -> dict[str, float]:
+    from nonebot_plugin_picstatus.collectors import registered_collectors
+
+    instance = registered_collectors[name]()
+    instance.name = name
+    if hasattr(instance, "min_baseline_age"):
+        # do not measure the sleep of normal counter collectors
+        instance.min_baseline_age = 0
+    # first call primes counters and per process cpu percent
+    await call_once(instance)
+
+    elapsed: list[float] = []
+    allocated: list[int] = []
+    for _ in range(rounds):
+        tracemalloc.start()
+        start = time.perf_counter()
+        await call_once(instance)
+        elapsed.append(time.perf_counter() - start)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        allocated.append(peak)
+
+    return {
+        "time_ms": sorted(elapsed)[len(elapsed) // 2] * 1000,
+        "alloc_kb": max(allocated) / 1024,
+    }
+
+
+def check_budget(
+    results: dict[str, dict[str, float]],
+    budget: dict[str, dict[str, float]],
+) -> list[str]:
+    failures = []
+    for name, result in results.items():
+        for metric, limit in budget.get(name, {}).items():
+            if (value := result.get(metric)) is not None and value > limit:
+                failures.append(f"{name}: {metric} {value:.2f} > {limit:.2f}")
+    return failures
+
+
+async def main():
+    args = parse_args()
+    load_plugin()
+
+    from nonebot_plugin_picstatus.collectors import registered_collectors
+
+    names = [
+        x
+        for x in sorted(registered_collectors)
+        if x not in args.skip and (args.only is None or x in args.only)
+    ]
+    host = FakeHost(
+        processes=args.processes,
+        mounts=args.mounts,
+        nics=args.nics,
+        disks=args.disks,
+        seed=args.seed,
+    )
+
+    results: dict[str, dict[str, float]] = {}
+    with host.install():
+        for name in names:
+            results[name] = await bench_one(name, args.rounds)
+
+    print(f"{'collector':<28} {'time (ms)':>12} {'peak alloc (KiB)':>18}")
+    for name, x in results.items():
+        print(f"{name:<28} {x['time_ms']:>12.2f} {x['alloc_kb']:>18.1f}")
+
+    budget = json.loads(args.budget.read_text("u8")) if args.budget.exists() else {}
+    if failures := check_budget(results, budget):
+        print("\nBudget exceeded:")
+        for x in failures:
+            print(f"  {x}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,356 @@
+"""
+deterministic fake psutil backend simulating large hosts
+
+usage:
+
+    with FakeHost(processes=20000, mounts=300, nics=500).install():
+        ...  # every psutil call used by collectors now hits the fake host
+"""
+
+import random
+import sys
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any, NamedTuple
+
+import psutil
+from psutil._common import scpustats, sdiskpart, sdiskusage, snetio
+
+
+class pmem(NamedTuple):  # noqa: N801
+    rss: int
+    vms: int
+
+
+class pfullmem(NamedTuple):  # noqa: N801
+    rss: int
+    vms: int
+    uss: int
+    pss: int
+    swap: int
+
+
+class pio(NamedTuple):  # noqa: N801
+    read_count: int
+    write_count: int
+    read_bytes: int
+    write_bytes: int
+
+
+class puids(NamedTuple):  # noqa: N801
+    real: int
+    effective: int
+    saved: int
+
+
+class sdiskio(NamedTuple):  # noqa: N801
+    # same fields as `psutil._pslinux.sdiskio`
+    read_count: int
+    write_count: int
+    read_bytes: int
+    write_bytes: int
+    read_time: int
+    write_time: int
+    read_merged_count: int
+    write_merged_count: int
+    busy_time: int
+
+
+class svmem(NamedTuple):  # noqa: N801
+    total: int
+    available: int
+    percent: float
+    used: int
+    free: int
+
+
+class sswap(NamedTuple):  # noqa: N801
+    total: int
+    used: int
+    free: int
+    percent: float
+    sin: int
+    sout: int
+
+
+class scpufreq(NamedTuple):  # noqa: N801
+    current: float
+    min: float  # noqa: A003
+    max: float  # noqa: A003
+
+
+PROC_NAMES = (
+    "python",
+    "chrome",
+    "node",
+    "postgres",
+    "nginx",
+    "containerd-shim",
+    "kworker/0:1",
+    "sshd",
+    "bash",
+    "java",
+)
+
+
+class FakeProcess:
+    def __init__(self, host: "FakeHost", pid: int, rnd: random.Random) -> None:
+        self.host = host
+        self.pid = pid
+        self._ppid = 1 if pid < 64 else rnd.randrange(1, pid)
+        self._name = f"{rnd.choice(PROC_NAMES)}"
+        self._cpu = rnd.random() * 10 if rnd.random() < 0.05 else rnd.random() * 0.1
+        self._rss = rnd.randrange(1 << 20, 1 << 30)
+        self._threads = rnd.randrange(1, 64)
+        self._fds = rnd.randrange(3, 512)
+        self._io_rate = rnd.randrange(0, 1 << 20)
+        self._uid = rnd.choice((0, 1000, 1001, 65534))
+        self._cgroup = f"/kubepods/pod{pid % 97}/container{pid % 7}"
+        self.info: dict[str, Any] = {}
+
+    def name(self) -> str:
+        return self._name
+
+    def ppid(self) -> int:
+        return self._ppid
+
+    def cpu_percent(self, interval: float | None = None) -> float:  # noqa: ARG002
+        return self._cpu
+
+    def memory_info(self) -> pmem:
+        return pmem(rss=self._rss, vms=self._rss * 4)
+
+    def memory_full_info(self) -> pfullmem:
+        return pfullmem(
+            rss=self._rss,
+            vms=self._rss * 4,
+            uss=self._rss // 2,
+            pss=self._rss * 3 // 4,
+            swap=0,
+        )
+
+    def num_threads(self) -> int:
+        return self._threads
+
+    def num_fds(self) -> int:
+        return self._fds
+
+    def io_counters(self) -> pio:
+        tick = self.host.tick
+        return pio(
+            read_count=tick * 10,
+            write_count=tick * 10,
+            read_bytes=tick * self._io_rate,
+            write_bytes=tick * self._io_rate // 2,
+        )
+
+    def uids(self) -> puids:
+        return puids(self._uid, self._uid, self._uid)
+
+    def create_time(self) -> float:
+        return 1_700_000_000.0 + self.pid
+
+    def children(self, recursive: bool = False) -> list["FakeProcess"]:
+        children_map = self.host.children_map
+        res = list(children_map.get(self.pid, ()))
+        if recursive:
+            for x in res:  # list grows while iterating, breadth first
+                res.extend(children_map.get(x.pid, ()))
+        return res
+
+    def is_running(self) -> bool:
+        return True
+
+    @contextmanager
+    def oneshot(self):
+        yield
+
+    def as_dict(self, attrs: list[str] | None = None, ad_value: Any = None):  # noqa: ARG002
+        return {x: getattr(self, x)() for x in (attrs or ())}
+
+
+class FakeHost:
+    def __init__(
+        self,
+        processes: int = 20000,
+        mounts: int = 300,
+        nics: int = 500,
+        disks: int = 16,
+        cpus: int = 64,
+        browsers: int = 8,
+        seed: int = 0,
+    ) -> None:
+        rnd = random.Random(seed)
+        self.tick = 0
+        self.cpus = cpus
+        self.procs = [FakeProcess(self, pid, rnd) for pid in range(1, processes + 1)]
+
+        # the bot process with a few browser processes spawned by htmlrender
+        self.self_proc = FakeProcess(self, processes + 1, rnd)
+        self.self_proc._ppid, self.self_proc._name = 1, "python"
+        self.procs.append(self.self_proc)
+        for pid in range(processes + 2, processes + 2 + browsers):
+            proc = FakeProcess(self, pid, rnd)
+            proc._ppid, proc._name = processes + 1, "chrome"
+            self.procs.append(proc)
+
+        self.proc_map = {x.pid: x for x in self.procs}
+        self.children_map: dict[int, list[FakeProcess]] = {}
+        for x in self.procs:
+            self.children_map.setdefault(x._ppid, []).append(x)
+        self.parts = [
+            sdiskpart(
+                device="/dev/sda1" if i == 0 else f"/dev/loop{i}",
+                mountpoint="/" if i == 0 else f"/var/lib/containers/overlay/{i}/merged",
+                fstype="ext4" if i == 0 else "overlay",
+                opts="rw,relatime",
+            )
+            for i in range(mounts)
+        ]
+        self.usages = {
+            x.mountpoint: (rnd.randrange(1 << 30, 1 << 40), rnd.random())
+            for x in self.parts
+        }
+        self.disk_rates = {
+            f"nvme{i}n1": rnd.randrange(0, 1 << 26) for i in range(disks)
+        }
+        self.nic_rates = {
+            ("eth0" if i == 0 else f"veth{i:05x}"): rnd.randrange(0, 1 << 24)
+            for i in range(nics)
+        }
+
+    def _advance(self) -> int:
+        self.tick += 1
+        return self.tick
+
+    def process_iter(
+        self,
+        attrs: list[str] | None = None,
+        ad_value: Any = None,
+    ) -> Iterator[FakeProcess]:
+        for x in self.procs:
+            if attrs is not None:
+                x.info = x.as_dict(attrs, ad_value)
+            yield x
+
+    def process(self, pid: int | None = None) -> FakeProcess:
+        if pid is None:
+            return self.self_proc
+        if pid not in self.proc_map:
+            raise psutil.NoSuchProcess(pid)
+        return self.proc_map[pid]
+
+    def pids(self) -> list[int]:
+        return list(self.proc_map)
+
+    def disk_partitions(self, all: bool = False) -> list[sdiskpart]:  # noqa: A002, ARG002
+        return list(self.parts)
+
+    def disk_usage(self, path: str) -> sdiskusage:
+        total, ratio = self.usages[path]
+        used = int(total * ratio)
+        return sdiskusage(total, used, total - used, round(ratio * 100, 1))
+
+    def disk_io_counters(self, perdisk: bool = False, nowrap: bool = True):  # noqa: ARG002
+        tick = self._advance()
+        return {
+            name: sdiskio(
+                read_count=tick * 100,
+                write_count=tick * 50,
+                read_bytes=tick * rate,
+                write_bytes=tick * rate // 2,
+                read_time=tick * 20,
+                write_time=tick * 10,
+                read_merged_count=0,
+                write_merged_count=0,
+                busy_time=tick * 30,
+            )
+            for name, rate in self.disk_rates.items()
+        }
+
+    def net_io_counters(self, pernic: bool = False, nowrap: bool = True):  # noqa: ARG002
+        tick = self._advance()
+        return {
+            name: snetio(
+                bytes_sent=tick * rate,
+                bytes_recv=tick * rate * 2,
+                packets_sent=tick * 10,
+                packets_recv=tick * 20,
+                errin=0,
+                errout=0,
+                dropin=0,
+                dropout=0,
+            )
+            for name, rate in self.nic_rates.items()
+        }
+
+    def cpu_count(self, logical: bool = True) -> int:
+        return self.cpus if logical else self.cpus // 2
+
+    def cpu_percent(self, interval: float | None = None, percpu: bool = False):  # noqa: ARG002
+        return 42.0
+
+    def cpu_freq(self, percpu: bool = False) -> scpufreq:  # noqa: ARG002
+        return scpufreq(current=2400.0, min=800.0, max=3600.0)
+
+    def cpu_stats(self) -> scpustats:
+        tick = self._advance()
+        return scpustats(
+            ctx_switches=tick * self.cpus * 1000,
+            interrupts=tick * self.cpus * 500,
+            soft_interrupts=tick * self.cpus * 200,
+            syscalls=0,
+        )
+
+    def virtual_memory(self) -> svmem:
+        total = 512 << 30
+        return svmem(total, total // 2, 50.0, total // 2, total // 4)
+
+    def swap_memory(self) -> sswap:
+        total = 8 << 30
+        return sswap(total, total // 8, total - total // 8, 12.5, 0, 0)
+
+    @contextmanager
+    def install(self):
+        """replace psutil functions used by collectors with this fake host"""
+        patches = {
+            "process_iter": self.process_iter,
+            "Process": self.process,
+            "pids": self.pids,
+            "disk_partitions": self.disk_partitions,
+            "disk_usage": self.disk_usage,
+            "disk_io_counters": self.disk_io_counters,
+            "net_io_counters": self.net_io_counters,
+            "cpu_count": self.cpu_count,
+            "cpu_percent": self.cpu_percent,
+            "cpu_freq": self.cpu_freq,
+            "cpu_stats": self.cpu_stats,
+            "virtual_memory": self.virtual_memory,
+            "swap_memory": self.swap_memory,
+        }
+        original = {k: getattr(psutil, k) for k in patches}
+        for k, v in patches.items():
+            setattr(psutil, k, v)
+
+        # mount table reads /proc/self/mountinfo directly on Linux,
+        # make it list partitions of the fake host instead
+        disk = sys.modules.get("nonebot_plugin_picstatus.collectors.disk")
+        original_mount_table = disk.mount_table if disk else None
+        if disk:
+            disk.mount_table = disk.MountTable(use_mountinfo=False)
+
+        # self process tracker holds the real bot process since import
+        process = sys.modules.get("nonebot_plugin_picstatus.collectors.process")
+        original_tracker = process.self_process_tracker if process else None
+        if process:
+            process.self_process_tracker = process.SelfProcessTracker()
+
+        try:
+            yield self
+        finally:
+            for k, v in original.items():
+                setattr(psutil, k, v)
+            if disk:
+                disk.mount_table = original_mount_table
+            if process:
+                process.self_process_tracker = original_tracker
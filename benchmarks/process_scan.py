@@ -0,0 +1,108 @@
+"""
+compare the process scanner against the legacy full-sort implementation
+
+    python -m benchmarks.process_scan [--processes 20000] [--rounds 5]
+"""
+
+import argparse
+import time
+import tracemalloc
+from collections.abc import Callable
+from typing import Any
+
+import psutil
+
+from . import load_plugin
+from .fake_psutil import FakeHost
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.process_scan")
+    parser.add_argument("--processes", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rounds", type=int, default=5)
+    return parser.parse_args()
+
+
+def legacy_get_process_status() -> list[Any]:
+    """scanner before the heap-based rewrite, kept here for comparison"""
+
+    from nonebot_plugin_picstatus.collectors.process import ProcessStatus
+    from nonebot_plugin_picstatus.config import config
+    from nonebot_plugin_picstatus.util import match_list_regexp
+
+    if not config.ps_proc_len:
+        return []
+
+    def parse_one(proc: psutil.Process) -> ProcessStatus | None:
+        name = proc.name()
+        if match_list_regexp(config.ps_ignore_procs, name):
+            return None
+        cpu_count = psutil.cpu_count()
+        with proc.oneshot():
+            cpu = proc.cpu_percent()
+            cpu = (
+                (cpu / cpu_count) if config.ps_proc_cpu_max_100p and cpu_count else cpu
+            )
+            mem: int = proc.memory_info().rss
+        return ProcessStatus(name=name, cpu=cpu, mem=mem)
+
+    def sorter(x: ProcessStatus):
+        if config.ps_proc_sort_by == "mem":
+            return x.mem
+        return x.cpu
+
+    def safe_parse_one(proc: psutil.Process) -> ProcessStatus | None:
+        try:
+            return parse_one(proc)
+        except Exception:
+            return None
+
+    proc_list = [x for x in map(safe_parse_one, psutil.process_iter()) if x]
+    proc_list.sort(key=sorter, reverse=True)
+    return proc_list[: config.ps_proc_len]
+
+
+def bench(func: Callable[[], Any], rounds: int) -> tuple[float, float, Any]:
+    result = func()
+    elapsed: list[float] = []
+    allocated: list[int] = []
+    for _ in range(rounds):
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = func()
+        elapsed.append(time.perf_counter() - start)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        allocated.append(peak)
+    return (
+        sorted(elapsed)[len(elapsed) // 2] * 1000,
+        max(allocated) / 1024,
+        result,
+    )
+
+
+def main():
+    args = parse_args()
+    load_plugin()
+
+    from nonebot_plugin_picstatus.collectors.process import get_process_status
+
+    host = FakeHost(processes=args.processes, seed=args.seed)
+    with host.install():
+        legacy_ms, legacy_kb, legacy_res = bench(
+            legacy_get_process_status,
+            args.rounds,
+        )
+        new_ms, new_kb, new_res = bench(get_process_status, args.rounds)
+
+    print(f"{'scanner':<10} {'time (ms)':>12} {'peak alloc (KiB)':>18}")
+    print(f"{'legacy':<10} {legacy_ms:>12.2f} {legacy_kb:>18.1f}")
+    print(f"{'current':<10} {new_ms:>12.2f} {new_kb:>18.1f}")
+    print(f"\nspeedup: {legacy_ms / new_ms:.2f}x")
+    if legacy_res != new_res:
+        print("WARNING: results differ from legacy scanner")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,7 @@ from nonebot_plugin_picstatus.collectors import (
     collector,
     first_time_collector,
     normal_collector,
+    numeric_periodic_collector,
     periodic_collector,
 )
 
@@ -65,6 +66,26 @@ async def periodic_counter():
     return periodic_counter_count
 
 
+# endregion
+
+# region 3.1. numeric_periodic_collector
+
+numeric_periodic_counter_count = 0
+
+
+# 和 periodic_collector 一样，但只能返回数字，结果保存在紧凑的 NumericRingBuffer 中
+# 适合需要保存较长历史记录的数据，在模板中可以直接使用以下方法：
+#   - latest: 最新的值
+#   - min() / max() / mean() / percentile(q)：（最近 window 条记录的）统计值
+# 内置的此类 collector 有 cpu_percent_series、memory_percent_series、
+# memory_used_series、swap_percent_series 与 network_io_series
+@numeric_periodic_collector()
+async def numeric_periodic_counter() -> float:
+    global numeric_periodic_counter_count
+    numeric_periodic_counter_count += 1
+    return numeric_periodic_counter_count
+
+
 # endregion
 
 
@@ -8,14 +8,19 @@ require("nonebot_plugin_alconna")
 require("nonebot_plugin_uninfo")
 require("nonebot_plugin_localstore")
 
-from . import __main__ as __main__, misc_statistics as misc_statistics
+from . import (
+    __main__ as __main__,
+    history as history,
+    misc_statistics as misc_statistics,
+)
 from .bg_provider import bg_preloader
 from .collectors import (
-    enable_collectors,
+    enable_collectors_in_background,
     load_builtin_collectors,
     registered_collectors,
 )
 from .config import ConfigModel, config
+from .procfs import setup_procfs_backend
 from .templates import load_builtin_templates, loaded_templates
 
 driver = get_driver()
@@ -24,28 +29,35 @@ driver = get_driver()
 # lazy load builtin templates and collectors
 @driver.on_startup
 async def _():
+    if config.ps_procfs_backend:
+        setup_procfs_backend()
+
     if config.ps_template not in loaded_templates:
         load_builtin_templates()
     current_template = loaded_templates.get(config.ps_template)
     if current_template is None:
         raise ValueError(f"Template {config.ps_template} not found")
 
-    if (current_template.collectors is None) or any(
-        (x not in registered_collectors) for x in current_template.collectors
-    ):
+    if current_template.collectors is None:
         load_builtin_collectors()
+    elif missing := [
+        x for x in current_template.collectors if x not in registered_collectors
+    ]:
+        load_builtin_collectors(*missing)
 
     collectors = (
         set(registered_collectors)
         if current_template.collectors is None
         else current_template.collectors
     )
-    await enable_collectors(*collectors)
+    # do not block startup of nonebot and other plugins
+    enable_collectors_in_background(*collectors)
 
     bg_preloader.start_preload()
 
 
 usage = f"指令：{' / '.join(config.ps_command)}"
+usage += "\nSuperUser 可在指令后加上 统计 / stats 查看收集器耗时统计"
 if config.ps_need_at:
     usage += "\n注意：使用指令时需要@机器人"
 if config.ps_only_su:
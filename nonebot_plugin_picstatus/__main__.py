@@ -12,18 +12,32 @@ from nonebot.typing import T_State
 from nonebot_plugin_alconna.uniseg import Image, OriginalUniMsg, UniMessage, image_fetch
 
 from .bg_provider import BgBytesData, bg_preloader
-from .collectors import collect_all
+from .collectors import collect_all_with_stale, collector_stats
 from .config import config
 from .misc_statistics import bot_avatar_cache, bot_info_cache, cache_bot_avatar
 from .templates import render_current_template
 
 
-def check_empty_arg_rule(arg: BaseMessage = CommandArg()):
-    return not arg.extract_plain_text()
+STATS_ARGS = {"stats", "统计"}
+
+
+def is_stats_arg(arg: BaseMessage) -> bool:
+    return arg.extract_plain_text().strip().lower() in STATS_ARGS
+
+
+async def check_arg_rule(
+    bot: BaseBot,
+    event: BaseEvent,
+    arg: BaseMessage = CommandArg(),
+):
+    if not arg.extract_plain_text():
+        return True
+    # collector stats are only for superusers
+    return is_stats_arg(arg) and await SUPERUSER(bot, event)
 
 
 def trigger_rule():
-    rule = Rule(check_empty_arg_rule)
+    rule = Rule(check_arg_rule)
     if config.ps_need_at:
         rule &= to_me()
     return rule
@@ -38,6 +52,27 @@ stat_matcher = on_command(
 )
 
 
+def format_ms(seconds: float) -> str:
+    return f"{seconds * 1000:.1f}"
+
+
+def format_collector_stats() -> str:
+    if not collector_stats:
+        return "暂无收集器统计数据"
+    lines = ["收集器 [来源] 调用/错误/超时 | p50 p90 p99 max (ms)"]
+    for (name, source), x in sorted(
+        collector_stats.items(),
+        key=lambda x: x[1].percentile(0.9),
+        reverse=True,
+    ):
+        lines.append(
+            f"{name} [{source}] {x.calls}/{x.errors}/{x.timeouts} | "
+            f"{format_ms(x.percentile(0.5))} {format_ms(x.percentile(0.9))} "
+            f"{format_ms(x.percentile(0.99))} {format_ms(x.max_time)}",
+        )
+    return "\n".join(lines)
+
+
 async def get_pic_from_msg(msg: UniMessage) -> BgBytesData | None:
     msg = r if ((r := extract_reply_msg(msg)) and Image in r) else msg
     if Image not in msg:
@@ -55,7 +90,18 @@ async def get_pic_from_msg(msg: UniMessage) -> BgBytesData | None:
 
 
 @stat_matcher.handle()
-async def _(bot: BaseBot, event: BaseEvent, state: T_State, msg: OriginalUniMsg):
+async def _(
+    bot: BaseBot,
+    event: BaseEvent,
+    state: T_State,
+    msg: OriginalUniMsg,
+    arg: BaseMessage = CommandArg(),
+):
+    if is_stats_arg(arg):
+        await UniMessage(format_collector_stats()).finish(
+            reply_to=config.ps_reply_target,
+        )
+
     if (
         (bot.self_id not in bot_avatar_cache)
         and (info := bot_info_cache.get(bot.self_id))
@@ -70,8 +116,11 @@ async def _(bot: BaseBot, event: BaseEvent, state: T_State, msg: OriginalUniMsg)
         return await bg_preloader.get()
 
     try:
-        bg, collected = await asyncio.gather(get_bg(), collect_all())
-        ret = await render_current_template(collected=collected, bg=bg)
+        bg, (collected, stale) = await asyncio.gather(
+            get_bg(),
+            collect_all_with_stale(),
+        )
+        ret = await render_current_template(collected=collected, bg=bg, stale=stale)
     except Exception:
         logger.exception("获取运行状态图失败")
         await UniMessage("获取运行状态图片失败，请检查后台输出").send(
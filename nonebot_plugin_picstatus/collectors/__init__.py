@@ -2,17 +2,23 @@ import asyncio
 import importlib
 import time
 from abc import abstractmethod
+from bisect import bisect_left
 from collections import deque
 from collections.abc import Awaitable, Callable
-from contextlib import suppress
-from pathlib import Path
-from typing import Any, Generic, TypeVar
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, suppress
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Any, Generic, ParamSpec, TypeAlias, TypeVar
 from typing_extensions import override
 
-from nonebot import logger
+from nonebot import get_driver, logger
+from nonebot.matcher import current_bot
 from nonebot_plugin_apscheduler import scheduler
 
 from ..config import config
+from ..series import NumericRingBuffer, NumericSeriesMap
 
 T = TypeVar("T")
 TI = TypeVar("TI")
@@ -20,6 +26,7 @@ TR = TypeVar("TR")
 TC = TypeVar("TC", bound="Collector")
 TCF = TypeVar("TCF", bound=Callable[[], Awaitable[Any]])
 R = TypeVar("R")
+P = ParamSpec("P")
 
 Undefined = type("Undefined", (), {})
 
@@ -28,7 +35,76 @@ class SkipCollectError(Exception):
     pass
 
 
+# region stats
+
+# upper bounds of latency buckets, from 0.1ms to about 52s
+LATENCY_BUCKETS = tuple(0.0001 * 2**i for i in range(20))
+
+
+class CallStats:
+    def __init__(self) -> None:
+        self.calls: int = 0
+        self.errors: int = 0
+        self.timeouts: int = 0
+        self.total_time: float = 0
+        self.max_time: float = 0
+        # last bucket holds everything exceeds the largest bound
+        self.buckets: list[int] = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def record(self, elapsed: float):
+        self.calls += 1
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        self.buckets[bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+
+    def percentile(self, q: float) -> float:
+        """returns upper bound of the bucket where q (0~1) percentile falls"""
+        if not self.calls:
+            return 0
+        target = q * self.calls
+        count = 0
+        for i, x in enumerate(self.buckets):
+            count += x
+            if count >= target:
+                break
+        return LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else self.max_time
+
+
+collector_stats: dict[tuple[str, str], CallStats] = {}
+"""key is (collector name, call source), source is `get` or `collect`"""
+
+
+@contextmanager
+def record_call(name: str, source: str):
+    stats = collector_stats.get((name, source))
+    if not stats:
+        stats = collector_stats[(name, source)] = CallStats()
+    start = time.perf_counter()
+    try:
+        yield
+    except (SkipCollectError, asyncio.CancelledError):
+        raise
+    except asyncio.TimeoutError:
+        stats.timeouts += 1
+        raise
+    except Exception:
+        stats.errors += 1
+        raise
+    finally:
+        stats.record(time.perf_counter() - start)
+
+
+# endregion
+
+
 class Collector(Generic[TI, TR]):
+    name: str = ""
+
+    def __init__(self) -> None:
+        super().__init__()
+        # set when `get` is able to return meaningful data
+        self.ready = asyncio.Event()
+
     @abstractmethod
     async def _get(self) -> TI: ...
 
@@ -39,6 +115,7 @@ class Collector(Generic[TI, TR]):
 class BaseNormalCollector(Collector[T, T], Generic[T]):
     def __init__(self) -> None:
         super().__init__()
+        self.ready.set()
 
     @override
     async def get(self) -> T:
@@ -49,34 +126,163 @@ class BaseFirstTimeCollector(Collector[T, T], Generic[T]):
     def __init__(self) -> None:
         super().__init__()
         self._cached: T | Undefined = Undefined()
+        self._lock = asyncio.Lock()
 
     @override
     async def get(self) -> T:
         if not isinstance(self._cached, Undefined):
             return self._cached
-        data = await self._get()
-        self._cached = data
-        return data
+        # callers during startup should wait for the running call
+        async with self._lock:
+            if not isinstance(self._cached, Undefined):
+                return self._cached
+            try:
+                data = await self._get()
+            finally:
+                # failed result is not cached, next call will try again
+                self.ready.set()
+            self._cached = data
+            return data
+
+
+collected_hooks: list[Callable[["BasePeriodicCollector", Any], Any]] = []
+"""called with collector and its newly collected data after every successful collect"""
 
 
 class BasePeriodicCollector(Collector[T, deque[T]], Generic[T]):
+    interval: float | None = None
+    """collect interval of this collector, `None` means `ps_collect_interval`"""
+
     def __init__(self, size: int = config.ps_default_collect_cache_size) -> None:
         super().__init__()
         self.data = deque(maxlen=size)
+        self.collecting: bool = False
+        self.last_collect_time: float | None = None
+        self.skipped_runs: int = 0
+        self.late_runs: int = 0
+        self.last_drift: float = 0
+        self.max_drift: float = 0
+
+    @property
+    def collect_interval(self) -> float:
+        return (
+            config.ps_collect_intervals.get(self.name)
+            or self.interval
+            or config.ps_collect_interval
+        )
+
+    @property
+    def idle_collect_interval(self) -> float:
+        interval = config.ps_collect_idle_interval
+        # keep history buffers dense enough to be meaningful
+        if (self.data.maxlen or 0) > 1:
+            interval = min(interval, config.ps_collect_idle_history_interval)
+        return max(interval, self.collect_interval)
+
+    @property
+    def current_interval(self) -> float:
+        return self.idle_collect_interval if is_idle() else self.collect_interval
+
+    def should_collect(self) -> bool:
+        if (self.last_collect_time is None) or (not is_idle()):
+            return True
+        # scheduled job still ticks at normal interval, allow half a tick earlier
+        elapsed = time.monotonic() - self.last_collect_time
+        return elapsed + self.collect_interval / 2 >= self.idle_collect_interval
 
     @override
     async def get(self) -> deque[T]:
         return self.data
 
+    def _record_drift(self):
+        now = time.monotonic()
+        if self.last_collect_time is not None:
+            interval = self.current_interval
+            drift = now - self.last_collect_time - interval
+            self.last_drift = drift
+            self.max_drift = max(self.max_drift, drift)
+            if drift > interval / 2:
+                self.late_runs += 1
+        self.last_collect_time = now
+
     async def collect(self):
+        if self.collecting:
+            self.skipped_runs += 1
+            logger.debug(
+                f"Collector {self.name} is still running, skipped this run"
+                f" (skipped {self.skipped_runs} times)",
+            )
+            return
+
+        self.collecting = True
+        self._record_drift()
         try:
-            data = await self._get()
+            with record_call(self.name, "collect"):
+                data = await self._get()
         except SkipCollectError:
+            # e.g. history restored, or keep waiting for the next run
+            if self.data:
+                self.ready.set()
             return
         except Exception:
             logger.exception("Error occurred while collecting data")
+            # do not let callers wait forever
+            self.ready.set()
         else:
             self.data.append(data)
+            self.ready.set()
+            for hook in collected_hooks:
+                try:
+                    hook(self, data)
+                except Exception:
+                    logger.exception("Error occurred in collected hook")
+        finally:
+            self.collecting = False
+
+
+class BaseNumericPeriodicCollector(BasePeriodicCollector[float]):
+    """periodic collector stores history in a compact `NumericRingBuffer`"""
+
+    def __init__(self, size: int = config.ps_default_collect_cache_size) -> None:
+        super().__init__(size)
+        self.data = NumericRingBuffer(size)  # type: ignore
+
+    @override
+    async def get(self) -> NumericRingBuffer:  # type: ignore
+        return self.data  # type: ignore
+
+
+class BaseNumericMapPeriodicCollector(BasePeriodicCollector[dict[str, float]]):
+    """periodic collector stores keyed history in a `NumericSeriesMap`"""
+
+    def __init__(self, size: int = config.ps_default_collect_cache_size) -> None:
+        super().__init__(size)
+        self.data = NumericSeriesMap(size)  # type: ignore
+
+    @override
+    async def get(self) -> NumericSeriesMap:  # type: ignore
+        return self.data  # type: ignore
+
+
+last_demand_time: float = time.monotonic()
+
+
+def is_idle() -> bool:
+    return (config.ps_collect_idle_after is not None) and (
+        time.monotonic() - last_demand_time > config.ps_collect_idle_after
+    )
+
+
+def mark_collect_demand():
+    global last_demand_time
+    was_idle = is_idle()
+    last_demand_time = time.monotonic()
+    if was_idle:
+        logger.debug("Command arrived after idle, ramping periodic collectors back")
+        with sample_cycle():
+            for x in enabled_collectors.values():
+                if isinstance(x, BasePeriodicCollector):
+                    _spawn_collect(x)
 
 
 registered_collectors: dict[str, type[Collector]] = {}
@@ -102,17 +308,65 @@ def _enable_collector(name: str):
         instance = cls(size=config.ps_collect_cache_size[name])
     else:
         instance = cls()
+    instance.name = name
     enabled_collectors[name] = instance
 
 
+enabled_hooks: list[Callable[[], Awaitable[Any]]] = []
+"""called after collectors are enabled and before first collection"""
+
+
+collectors_ready = asyncio.Event()
+"""set when all enabled collectors finished initializing"""
+_init_collectors_task: asyncio.Task | None = None
+
+
+async def init_collectors():
+    start = time.perf_counter()
+    # every step is isolated, one failing step should not stop the others
+    steps = [
+        *enabled_hooks,
+        init_first_time_collectors,
+        setup_periodic_collectors_update_job,
+        setup_counter_baseline_refresh_job,
+    ]
+    try:
+        for step in steps:
+            try:
+                await step()
+            except Exception:
+                logger.exception(f"Error occurred while running init step {step}")
+    finally:
+        collectors_ready.set()
+    logger.info(f"Collectors initialized in {time.perf_counter() - start:.2f}s")
+
+
 async def enable_collectors(*names: str):
     for name in names:
         _enable_collector(name)
-    await init_first_time_collectors()
-    await setup_periodic_collectors_update_job()
+    await init_collectors()
+
+
+def enable_collectors_in_background(*names: str) -> asyncio.Task:
+    """
+    enable collectors immediately and initialize them in background,
+    `collect_all` called before initialization finished
+    only waits for the collectors it needs
+    """
+    global _init_collectors_task
+    for name in names:
+        _enable_collector(name)
+    _init_collectors_task = asyncio.create_task(init_collectors())
+    return _init_collectors_task
 
 
-def functional_collector(cls: type[Collector], name: str | None = None):
+def functional_collector(
+    cls: type[Collector],
+    name: str | None = None,
+    **attrs: Any,
+):
+    """`attrs` are set as class attributes of the generated collector"""
+
     def deco(func: TCF) -> TCF:
         collector_name = name or func.__name__
         if not collector_name:
@@ -122,12 +376,120 @@ def functional_collector(cls: type[Collector], name: str | None = None):
             async def _get(self) -> Any:
                 return await func()
 
+        for k, v in attrs.items():
+            setattr(Collector, k, v)
+
         collector(collector_name)(Collector)
         return func
 
     return deco
 
 
+_blocking_executor: ThreadPoolExecutor | None = None
+
+
+def get_blocking_executor() -> ThreadPoolExecutor:
+    global _blocking_executor
+    if not _blocking_executor:
+        _blocking_executor = ThreadPoolExecutor(
+            max_workers=max(config.ps_blocking_workers, 1),
+            thread_name_prefix="picstatus_collector",
+        )
+    return _blocking_executor
+
+
+async def run_blocking(func: Callable[P, R], *args: P.args, **kwargs: P.kwargs) -> R:
+    return await asyncio.get_running_loop().run_in_executor(
+        get_blocking_executor(),
+        partial(func, *args, **kwargs),
+    )
+
+
+@get_driver().on_shutdown
+async def _():
+    if _blocking_executor:
+        _blocking_executor.shutdown(wait=False, cancel_futures=True)
+
+
+def blocking_collector(
+    name: str | None = None,
+    cls: type[Collector] = BaseNormalCollector,
+):
+    """register a sync function as collector, it will run in a thread pool"""
+
+    def deco(func: Callable[[], R]) -> Callable[[], R]:
+        collector_name = name or func.__name__
+
+        async def wrapper() -> R:
+            return await run_blocking(func)
+
+        functional_collector(cls, collector_name)(wrapper)
+        return func
+
+    return deco
+
+
+# region raw samples
+# collectors which read the same source share one raw sample per cycle
+# (one command or one periodic tick), so each source is only read once
+
+
+raw_sources: dict[str, tuple[Callable[[], Any], bool]] = {}
+raw_source_overrides: dict[str, tuple[Callable[[], Any], bool]] = {}
+"""alternative backends for raw sources, take precedence over `raw_sources`"""
+_sample_cycle: ContextVar[dict[str, asyncio.Future] | None] = ContextVar(
+    "_sample_cycle",
+    default=None,
+)
+
+
+def raw_source(
+    name: str | None = None,
+    blocking: bool = True,
+    override: bool = False,
+):
+    """
+    register a sync function as raw sample source,
+    set `blocking` to `False` for cheap sources to call it in event loop directly,
+    set `override` to `True` to register an alternative backend of a source
+    """
+
+    def deco(func: Callable[[], R]) -> Callable[[], R]:
+        target = raw_source_overrides if override else raw_sources
+        target[name or func.__name__] = (func, blocking)
+        return func
+
+    return deco
+
+
+@contextmanager
+def sample_cycle():
+    token = _sample_cycle.set({})
+    try:
+        yield
+    finally:
+        _sample_cycle.reset(token)
+
+
+async def _read_raw_source(name: str) -> Any:
+    func, blocking = raw_source_overrides.get(name) or raw_sources[name]
+    return (await run_blocking(func)) if blocking else func()
+
+
+async def get_raw_sample(name: str) -> Any:
+    if name not in raw_sources:
+        raise ValueError(f"Raw source {name} not found")
+    cycle = _sample_cycle.get()
+    if cycle is None:
+        return await _read_raw_source(name)
+    if (fut := cycle.get(name)) is None:
+        fut = cycle[name] = asyncio.ensure_future(_read_raw_source(name))
+    return await asyncio.shield(fut)
+
+
+# endregion
+
+
 def normal_collector(name: str | None = None):
     return functional_collector(BaseNormalCollector, name)
 
@@ -136,8 +498,15 @@ def first_time_collector(name: str | None = None):
     return functional_collector(BaseFirstTimeCollector, name)
 
 
-def periodic_collector(name: str | None = None):
-    return functional_collector(BasePeriodicCollector, name)
+def periodic_collector(name: str | None = None, interval: float | None = None):
+    return functional_collector(BasePeriodicCollector, name, interval=interval)
+
+
+def numeric_periodic_collector(
+    name: str | None = None,
+    interval: float | None = None,
+):
+    return functional_collector(BaseNumericPeriodicCollector, name, interval=interval)
 
 
 class BaseTimeBasedCounterCollector(Collector[R, Any], Generic[T, R]):
@@ -172,12 +541,43 @@ class NormalTimeBasedCounterCollector(
     BaseNormalCollector[R],
     Generic[T, R],
 ):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        # baseline younger than this will be waited for
+        # to keep the rate from being too noisy
+        self.min_baseline_age: float = 0.5
+
+    def _baseline_age(self) -> float | None:
+        if (not config.ps_counter_keep_baseline) or isinstance(
+            self.last_obj,
+            Undefined,
+        ):
+            return None
+        age = time.time() - self.last_time
+        if age > config.ps_counter_baseline_max_age:
+            return None
+        return age
+
+    async def refresh_baseline(self):
+        self.last_time = time.time()
+        self.last_obj = await self._get_obj()
+
+    async def _get_after(self, delay: float) -> R:
+        await asyncio.sleep(delay)
+        # samples of current cycle are outdated after sleeping
+        with sample_cycle():
+            return await self._get()
+
     @override
     async def get(self) -> R:
+        if (age := self._baseline_age()) is not None:
+            if age < self.min_baseline_age:
+                return await self._get_after(self.min_baseline_age - age)
+            return await self._get()
+
         with suppress(SkipCollectError):
             await self._get()
-        await asyncio.sleep(self.normal_delay)
-        return await self._get()
+        return await self._get_after(self.normal_delay)
 
 
 class PeriodicTimeBasedCounterCollector(
@@ -187,28 +587,197 @@ class PeriodicTimeBasedCounterCollector(
 ): ...
 
 
-async def collect_all() -> dict[str, Any]:
-    async def get(name: str):
-        return name, await enabled_collectors[name].get()
+last_collected: dict[str, Any] = {}
 
-    res = await asyncio.gather(*(get(name) for name in enabled_collectors))
-    return dict(res)
 
+def get_collector_timeout(name: str) -> float | None:
+    timeouts = [
+        x
+        for x in (config.ps_collector_timeouts.get(name), config.ps_collect_timeout)
+        if x is not None
+    ]
+    return min(timeouts) if timeouts else None
+
+
+async def _collect_one(name: str) -> tuple[str, Any, bool]:
+    timeout = get_collector_timeout(name)
+    instance = enabled_collectors[name]
+
+    async def get():
+        # first time collectors wait for the running call by their own lock
+        if not (
+            isinstance(instance, BaseFirstTimeCollector) or instance.ready.is_set()
+        ):
+            logger.debug(f"Waiting for collector {name} to be ready")
+            await instance.ready.wait()
+        return await instance.get()
+
+    try:
+        with record_call(name, "get"):
+            res = await asyncio.wait_for(get(), timeout)
+    except asyncio.TimeoutError:
+        has_last = name in last_collected
+        logger.warning(
+            f"Collector {name} timed out after {timeout}s, "
+            f"using {'last result' if has_last else 'placeholder'} instead",
+        )
+        return name, last_collected.get(name), True
+    last_collected[name] = res
+    return name, res, False
+
+
+CollectResult: TypeAlias = tuple[dict[str, Any], set[str]]
+"""collected data, and names of collectors whose result is stale"""
+
+
+async def _collect_all() -> CollectResult:
+    with sample_cycle():
+        res = await asyncio.gather(
+            *(_collect_one(name) for name in enabled_collectors),
+        )
+    collected: dict[str, Any] = {name: data for name, data, _ in res}
+    return collected, {name for name, _, stale in res if stale}
+
+
+# callers that share the same key share the same collection
+_collect_all_tasks: dict[str | None, asyncio.Task[CollectResult]] = {}
+_collect_all_results: dict[str | None, tuple[float, CollectResult]] = {}
+
+
+def _collect_all_key() -> str | None:
+    # `bots` collector depends on current bot in this case
+    if config.ps_show_current_bot_only:
+        with suppress(LookupError):
+            return current_bot.get().self_id
+    return None
+
+
+def _on_collect_all_done(key: str | None, task: asyncio.Task[CollectResult]):
+    if _collect_all_tasks.get(key) is task:
+        del _collect_all_tasks[key]
+    if (not task.cancelled()) and (not task.exception()):
+        _collect_all_results[key] = (time.monotonic(), task.result())
+
+
+async def collect_all_with_stale() -> CollectResult:
+    mark_collect_demand()
+    key = _collect_all_key()
+
+    if (cached := _collect_all_results.get(key)) and (
+        time.monotonic() - cached[0] <= config.ps_collect_reuse_window
+    ):
+        collected, stale = cached[1]
+        return collected.copy(), stale.copy()
+
+    if not (task := _collect_all_tasks.get(key)):
+        task = asyncio.create_task(_collect_all())
+        task.add_done_callback(lambda t: _on_collect_all_done(key, t))
+        _collect_all_tasks[key] = task
+    else:
+        logger.debug("Collection already running, waiting for its result")
 
-def load_builtin_collectors():
-    for module in Path(__file__).parent.iterdir():
-        if not module.name.startswith("_"):
-            importlib.import_module(f".{module.stem}", __package__)
+    # shield the shared task so one cancelled caller won't break others
+    # and copy result since templates may modify it
+    collected, stale = await asyncio.shield(task)
+    return collected.copy(), stale.copy()
 
 
-async def init_first_time_collectors():
-    await asyncio.gather(
-        *(
-            x.get()
-            for x in enabled_collectors.values()
-            if isinstance(x, BaseFirstTimeCollector)
-        ),
+async def collect_all() -> dict[str, Any]:
+    return (await collect_all_with_stale())[0]
+
+
+# keep this in sync with collectors registered in builtin modules,
+# so we know which module to import without importing all of them
+BUILTIN_COLLECTOR_MODULES: dict[str, set[str]] = {
+    "bot": {"bots"},
+    "cpu": {
+        "cpu_brand",
+        "cpu_count_logical",
+        "cpu_count",
+        "cpu_percent",
+        "cpu_percent_periodic",
+        "cpu_percent_series",
+        "cpu_freq",
+        "cpu_freq_periodic",
+        "cpu_stats",
+        "cpu_stats_periodic",
+    },
+    "disk": {"disk_usage", "disk_usage_periodic", "disk_io", "disk_io_periodic"},
+    "mem": {
+        "memory_stat",
+        "memory_stat_periodic",
+        "memory_percent_series",
+        "memory_used_series",
+        "swap_stat",
+        "swap_stat_periodic",
+        "swap_percent_series",
+    },
+    "misc": {
+        "nonebot_run_time",
+        "system_run_time",
+        "nonebot_version",
+        "ps_version",
+        "time",
+        "time_periodic",
+        "python_version",
+        "system_name",
+    },
+    "network": {
+        "network_io",
+        "network_io_periodic",
+        "network_io_series",
+        "network_connection",
+    },
+    "process": {
+        "process_status",
+        "process_status_periodic",
+        "self_status",
+        "self_status_periodic",
+    },
+}
+BUILTIN_COLLECTOR_MODULE_MAP = {
+    name: module
+    for module, names in BUILTIN_COLLECTOR_MODULES.items()
+    for name in names
+}
+
+
+def load_builtin_collectors(*names: str):
+    """import builtin modules providing given collectors, all if no name given"""
+    modules = (
+        {
+            BUILTIN_COLLECTOR_MODULE_MAP[x]
+            for x in names
+            if x in BUILTIN_COLLECTOR_MODULE_MAP
+        }
+        if names
+        else set(BUILTIN_COLLECTOR_MODULES)
     )
+    for module in modules:
+        importlib.import_module(f".{module}", __package__)
+        logger.debug(f"Loaded builtin collector module {module}")
+
+
+async def init_first_time_collectors():
+    collectors = [
+        x for x in enabled_collectors.values() if isinstance(x, BaseFirstTimeCollector)
+    ]
+    res = await asyncio.gather(*(x.get() for x in collectors), return_exceptions=True)
+    for x, r in zip(collectors, res):
+        if isinstance(r, Exception):
+            logger.opt(exception=r).error(
+                f"Error occurred while initializing collector {x.name}",
+            )
+
+
+_periodic_collect_tasks: set[asyncio.Task] = set()
+
+
+def _spawn_collect(x: BasePeriodicCollector):
+    # do not block the scheduler job, overlapping is guarded by collector itself
+    task = asyncio.create_task(x.collect())
+    _periodic_collect_tasks.add(task)
+    task.add_done_callback(_periodic_collect_tasks.discard)
 
 
 async def setup_periodic_collectors_update_job():
@@ -219,8 +788,65 @@ async def setup_periodic_collectors_update_job():
         return
     logger.debug("Setting up periodic collectors")
 
+    with sample_cycle():
+        await asyncio.gather(*(x.collect() for x in collectors))
+    for x in collectors:
+        # first scheduled run is offset, don't count it as drift
+        x.last_collect_time = None
+
+    # collectors with the same interval are collected together,
+    # and the start time of every group is staggered
+    groups: dict[float, list[BasePeriodicCollector]] = {}
+    for x in collectors:
+        groups.setdefault(x.collect_interval, []).append(x)
+
+    now = datetime.now().astimezone()
+    for i, (interval, group) in enumerate(sorted(groups.items())):
+        offset = interval * i / len(groups)
+
+        # must be a coroutine, apscheduler runs plain functions in worker threads
+        # where tasks can not be created
+        async def do(group: list[BasePeriodicCollector] = group):
+            with sample_cycle():
+                for x in group:
+                    if x.should_collect():
+                        _spawn_collect(x)
+
+        scheduler.add_job(
+            do,
+            "interval",
+            seconds=interval,
+            start_date=now + timedelta(seconds=interval + offset),
+            jitter=config.ps_collect_jitter or None,
+            max_instances=1,
+            coalesce=True,
+        )
+        logger.debug(
+            f"Scheduled {len(group)} periodic collectors"
+            f" with interval {interval}s, offset {offset:.2f}s",
+        )
+
+
+async def setup_counter_baseline_refresh_job():
+    if not (config.ps_counter_keep_baseline and config.ps_counter_baseline_refresh):
+        return
+    collectors = [
+        x
+        for x in enabled_collectors.values()
+        if isinstance(x, NormalTimeBasedCounterCollector)
+    ]
+    if not collectors:
+        return
+    logger.debug("Setting up counter baseline refresh job")
+
+    async def refresh_one(x: NormalTimeBasedCounterCollector):
+        try:
+            await x.refresh_baseline()
+        except Exception:
+            logger.exception("Error occurred while refreshing counter baseline")
+
     @scheduler.scheduled_job("interval", seconds=config.ps_collect_interval)
     async def _do():
-        await asyncio.gather(*(x.collect() for x in collectors))
+        await asyncio.gather(*(refresh_one(x) for x in collectors))
 
     await _do()
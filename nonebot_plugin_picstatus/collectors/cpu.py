@@ -1,11 +1,31 @@
+import json
+import platform
+from contextlib import suppress
 from dataclasses import dataclass
+from pathlib import Path
 from typing import cast
 
 import psutil
-from cpuinfo import get_cpu_info
+from cookit.loguru import warning_suppress
 from nonebot import logger
-
-from . import first_time_collector, normal_collector, periodic_collector
+from psutil._common import scpustats
+
+from ..config import CPU_BRAND_CACHE_PATH
+
+from . import (
+    BaseFirstTimeCollector,
+    BaseTimeBasedCounterCollector,
+    NormalTimeBasedCounterCollector,
+    PeriodicTimeBasedCounterCollector,
+    blocking_collector,
+    collector,
+    first_time_collector,
+    get_raw_sample,
+    normal_collector,
+    numeric_periodic_collector,
+    periodic_collector,
+    raw_source,
+)
 
 
 @dataclass
@@ -15,14 +35,66 @@ class CpuFreq:
     max: float | None  # noqa: A003
 
 
-@first_time_collector()
-async def cpu_brand() -> str:
+@dataclass
+class CpuStats:
+    ctx_switches: float
+    interrupts: float
+    soft_interrupts: float
+
+
+def get_boot_key() -> str:
+    """identifies current boot and kernel, cached cpu brand is invalid when changed"""
     try:
-        brand = (
-            cast("str", get_cpu_info().get("brand_raw", ""))
-            .split("@", maxsplit=1)[0]
-            .strip()
-        )
+        boot_id = Path("/proc/sys/kernel/random/boot_id").read_text().strip()
+    except OSError:
+        boot_id = str(psutil.boot_time())
+    return f"{boot_id}|{platform.release()}"
+
+
+def read_proc_cpu_brand() -> str | None:
+    try:
+        with Path("/proc/cpuinfo").open(encoding="u8") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key.strip() == "model name" and (value := value.strip()):
+                    return value
+    except OSError:
+        pass
+    return None
+
+
+def probe_cpu_brand() -> str:
+    if brand := read_proc_cpu_brand():
+        return brand
+
+    # py-cpuinfo forks a subprocess and is slow, only use it as fallback
+    from cpuinfo import get_cpu_info
+
+    return cast("str", get_cpu_info().get("brand_raw", ""))
+
+
+def get_cpu_brand_raw() -> str:
+    key = get_boot_key()
+    with suppress(Exception):
+        cached = json.loads(CPU_BRAND_CACHE_PATH.read_text("u8"))
+        if cached.get("key") == key and (brand := cached.get("brand")):
+            return brand
+
+    brand = probe_cpu_brand()
+    if brand:
+        with warning_suppress("Failed to write CPU brand cache"):
+            CPU_BRAND_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            CPU_BRAND_CACHE_PATH.write_text(
+                json.dumps({"key": key, "brand": brand}),
+                "u8",
+            )
+    return brand
+
+
+@blocking_collector(cls=BaseFirstTimeCollector)
+def cpu_brand() -> str:
+    try:
+        brand = get_cpu_brand_raw().split("@", maxsplit=1)[0].strip()
         if brand.lower().endswith(("cpu", "processor")):
             brand = brand.rsplit(maxsplit=1)[0].strip()
     except Exception:
@@ -42,16 +114,29 @@ async def cpu_count() -> int | None:
     return psutil.cpu_count(logical=False)
 
 
-async def get_cpu_percent() -> float:
+# psutil keeps the last cpu times globally,
+# so reading it more than once per cycle makes the result meaningless
+@raw_source("cpu_percent", blocking=False)
+def get_raw_cpu_percent() -> float:
     return psutil.cpu_percent()
 
 
+@raw_source("cpu_freq")
+def get_raw_cpu_freq():
+    return psutil.cpu_freq()
+
+
+async def get_cpu_percent() -> float:
+    return await get_raw_sample("cpu_percent")
+
+
 normal_collector("cpu_percent")(get_cpu_percent)
 periodic_collector("cpu_percent_periodic")(get_cpu_percent)
+numeric_periodic_collector("cpu_percent_series")(get_cpu_percent)
 
 
 async def get_cpu_freq() -> CpuFreq:
-    cpu_freq = psutil.cpu_freq()
+    cpu_freq = await get_raw_sample("cpu_freq")
     return CpuFreq(
         current=getattr(cpu_freq, "current", None),
         min=getattr(cpu_freq, "min", None),
@@ -61,3 +146,39 @@ async def get_cpu_freq() -> CpuFreq:
 
 normal_collector("cpu_freq")(get_cpu_freq)
 periodic_collector("cpu_freq_periodic")(get_cpu_freq)
+
+
+@raw_source("cpu_stats", blocking=False)
+def get_raw_cpu_stats() -> scpustats:
+    return psutil.cpu_stats()
+
+
+class BaseCpuStatsCollector(BaseTimeBasedCounterCollector[scpustats, CpuStats]):
+    async def _calc(
+        self,
+        past: scpustats,
+        now: scpustats,
+        time_passed: float,
+    ) -> CpuStats:
+        return CpuStats(
+            ctx_switches=(now.ctx_switches - past.ctx_switches) / time_passed,
+            interrupts=(now.interrupts - past.interrupts) / time_passed,
+            soft_interrupts=(now.soft_interrupts - past.soft_interrupts) / time_passed,
+        )
+
+    async def _get_obj(self) -> scpustats:
+        return await get_raw_sample("cpu_stats")
+
+
+@collector("cpu_stats")
+class NormalCpuStatsCollector(
+    BaseCpuStatsCollector,
+    NormalTimeBasedCounterCollector[scpustats, CpuStats],
+): ...
+
+
+@collector("cpu_stats_periodic")
+class PeriodicCpuStatsCollector(
+    BaseCpuStatsCollector,
+    PeriodicTimeBasedCounterCollector[scpustats, CpuStats],
+): ...
@@ -1,18 +1,36 @@
-from dataclasses import dataclass
-from typing import TypeAlias
+import re
+import select
+import sys
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, wait
+from dataclasses import dataclass, replace
+from pathlib import Path
+from queue import SimpleQueue
+from typing import Any, TypeAlias, TypeVar
 
 import psutil
-from psutil._common import sdiskio, sdiskpart
+from nonebot import logger
+from psutil._common import sdiskio, sdiskusage
 
 from ..config import config
-from ..util import match_list_regexp
+from ..util import (
+    compile_group_regexp,
+    compile_list_regexp,
+    match_compiled_list,
+    match_group,
+    top_n,
+)
 from . import (
     BaseTimeBasedCounterCollector,
     NormalTimeBasedCounterCollector,
     PeriodicTimeBasedCounterCollector,
     collector,
+    get_raw_sample,
     normal_collector,
     periodic_collector,
+    raw_source,
 )
 
 
@@ -22,6 +40,8 @@ class DiskUsageNormal:
     percent: float
     used: int
     total: int
+    stale: bool = False
+    """stat of this mount timed out, this is the last known result"""
 
 
 @dataclass
@@ -38,35 +58,275 @@ class DiskIO:
     name: str
     read: float
     write: float
+    read_iops: float = 0
+    write_iops: float = 0
+    await_time: float | None = None
+    """average milliseconds per request, None when there is no request"""
+    queue: float | None = None
+    """average number of requests in flight"""
+    util: float | None = None
+    """percent of time the disk was busy, not available on every platform"""
+
+
+R = TypeVar("R")
+
+DISK_STAT_MAX_WORKERS = 64
+
+
+class DaemonWorkerPool:
+    """
+    minimal thread pool with daemon workers,
+    unlike `ThreadPoolExecutor` a worker stuck on a dead mount
+    does not block interpreter exit,
+    and a new worker is spawned when every existing one is busy or stuck
+    """
+
+    def __init__(self, max_size: int, name: str) -> None:
+        self.max_size = max_size
+        self.name = name
+        self.queue: SimpleQueue[tuple[Future, Callable[..., Any], tuple]] = (
+            SimpleQueue()
+        )
+        self.threads: list[threading.Thread] = []
+        self.lock = threading.Lock()
+        self.idle = 0
+        """waiting workers minus queued tasks"""
+
+    def _work(self):
+        while True:
+            with self.lock:
+                self.idle += 1
+            future, func, args = self.queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(func(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def submit(self, func: Callable[..., R], *args: Any) -> "Future[R]":
+        future: Future[R] = Future()
+        with self.lock:
+            self.idle -= 1
+            if self.idle < 0 and len(self.threads) < self.max_size:
+                thread = threading.Thread(
+                    target=self._work,
+                    name=f"{self.name}_{len(self.threads)}",
+                    daemon=True,
+                )
+                thread.start()
+                self.threads.append(thread)
+        self.queue.put((future, func, args))
+        return future
+
+
+disk_stat_pool = DaemonWorkerPool(DISK_STAT_MAX_WORKERS, "picstatus_disk_stat")
+
+# mountpoint -> running stat, a hanging stat is never submitted twice
+_disk_stat_futures: dict[str, "Future[sdiskusage]"] = {}
+# overlapping calls run in different threads
+_disk_stat_lock = threading.Lock()
+# mountpoint -> last successful result
+_disk_usage_last: dict[str, DiskUsageNormal] = {}
+# mountpoint -> (next check time, current backoff)
+_disk_usage_backoff: dict[str, tuple[float, float]] = {}
+
+
+def get_stale_disk_usage(mountpoint: str) -> DiskUsageType | None:
+    if last := _disk_usage_last.get(mountpoint):
+        return replace(last, stale=True)
+    if config.ps_ignore_bad_parts:
+        return None
+    return DiskUsageWithExc(name=mountpoint, exception="读取超时")
+
+
+def backoff_disk_usage(mountpoint: str, now: float):
+    last_backoff = _disk_usage_backoff.get(mountpoint, (0, 0))[1]
+    backoff = min(
+        last_backoff * 2 if last_backoff else config.ps_disk_usage_backoff,
+        config.ps_disk_usage_backoff_max,
+    )
+    _disk_usage_backoff[mountpoint] = (now + backoff, backoff)
+    logger.warning(
+        f"Reading usage of mount {mountpoint} timed out, "
+        f"will retry after {backoff:.0f}s",
+    )
+
+
+MOUNTINFO_PATH = "/proc/self/mountinfo"
+FILESYSTEMS_PATH = "/proc/filesystems"
+# used when mount changes can not be watched
+MOUNT_TABLE_TTL = 60
+MOUNTINFO_ESCAPE_REGEXP = re.compile(r"\\([0-7]{3})")
+
+
+def unescape_mountinfo(txt: str) -> str:
+    return MOUNTINFO_ESCAPE_REGEXP.sub(lambda m: chr(int(m[1], 8)), txt)
+
+
+class MountTable:
+    """
+    filtered and deduplicated mountpoint list,
+    rebuilt only when `/proc/self/mountinfo` reports a change on Linux,
+    or after `MOUNT_TABLE_TTL` elsewhere
+    """
+
+    def __init__(self, use_mountinfo: bool = sys.platform.startswith("linux")):
+        self.lock = threading.Lock()
+        self.mountpoints: list[str] | None = None
+        self.built_time = 0.0
+        self.ignore_patterns: tuple[re.Pattern, ...] = ()
+        self.mountinfo = None
+        self.poller = None
+        if use_mountinfo:
+            try:
+                self.mountinfo = open(MOUNTINFO_PATH, encoding="u8")  # noqa: PTH123, SIM115
+                # mountinfo reports changes of the mount namespace as POLLPRI
+                self.poller = select.poll()
+                self.poller.register(self.mountinfo, select.POLLPRI | select.POLLERR)
+            except (OSError, AttributeError) as e:
+                logger.debug(f"Can not watch mount changes, fallback to TTL: {e}")
+                if self.mountinfo:
+                    self.mountinfo.close()
+                self.mountinfo = self.poller = None
+
+    def _changed(self, ignore_patterns: tuple[re.Pattern, ...]) -> bool:
+        if self.mountpoints is None or ignore_patterns is not self.ignore_patterns:
+            return True
+        if self.poller:
+            # poll itself consumes the event
+            return bool(self.poller.poll(0))
+        return time.monotonic() - self.built_time >= MOUNT_TABLE_TTL
+
+    def _read_mountinfo(self) -> list[tuple[str, str]]:
+        """(device id, mountpoint) of mounts on physical devices"""
+        assert self.mountinfo
+        with open(FILESYSTEMS_PATH, encoding="u8") as f:  # noqa: PTH123
+            # same as psutil.disk_partitions(all=False)
+            fstypes: set[str] = set()
+            for line in f:
+                nodev, _, fstype = line.rstrip("\n").partition("\t")
+                if (not nodev) or fstype == "zfs":
+                    fstypes.add(fstype)
+
+        self.mountinfo.seek(0)
+        res: list[tuple[str, str]] = []
+        for line in self.mountinfo.read().splitlines():
+            # <id> <parent> <major:minor> <root> <mountpoint> <opts> [optional...]
+            # - <fstype> <source> <super opts>
+            fields, _, tail = line.partition(" - ")
+            fields = fields.split()
+            tail = tail.split()
+            if len(fields) < 5 or len(tail) < 2:
+                continue
+            fstype, source = tail[0], tail[1]
+            if source in ("none", "") or fstype not in fstypes:
+                continue
+            res.append((fields[2], unescape_mountinfo(fields[4])))
+        return res
+
+    def _read_partitions(self) -> list[tuple[str, str]]:
+        # sources like `overlay` or `tmpfs` are labels shared by unrelated
+        # filesystems, only real device paths identify a filesystem here
+        return [
+            (
+                x.device if Path(x.device).is_absolute() else x.mountpoint,
+                x.mountpoint,
+            )
+            for x in psutil.disk_partitions()
+        ]
+
+    def _build(self, ignore_patterns: tuple[re.Pattern, ...]) -> list[str]:
+        mounts = self._read_mountinfo() if self.mountinfo else self._read_partitions()
+        seen_devices: set[str] = set()
+        mountpoints: list[str] = []
+        for device, mountpoint in mounts:
+            # ignored mounts should not hide other mounts of the same device
+            if match_compiled_list(ignore_patterns, mountpoint):
+                # logger.info(f"空间读取 分区 {mountpoint} 匹配 {regex.re.pattern}，忽略")
+                continue
+            # bind mounts and mounts sharing a filesystem are statted only once
+            if device in seen_devices:
+                continue
+            seen_devices.add(device)
+            mountpoints.append(mountpoint)
+        return mountpoints
+
+    def get(self) -> list[str]:
+        ignore_patterns = compile_list_regexp(tuple(config.ps_ignore_parts))
+        with self.lock:
+            if self._changed(ignore_patterns):
+                self.mountpoints = self._build(ignore_patterns)
+                self.ignore_patterns = ignore_patterns
+                self.built_time = time.monotonic()
+            assert self.mountpoints is not None
+            return self.mountpoints
+
+
+mount_table = MountTable()
 
 
-@periodic_collector()
-async def get_disk_usage() -> list[DiskUsageType]:
-    def get_one(disk: sdiskpart) -> DiskUsageType | None:
-        mountpoint = disk.mountpoint
+@raw_source("disk_usage")
+def get_disk_usage() -> list[DiskUsageType]:
+    mountpoints = mount_table.get()
 
-        if match_list_regexp(config.ps_ignore_parts, mountpoint):
-            # logger.info(f"空间读取 分区 {mountpoint} 匹配 {regex.re.pattern}，忽略")
-            return None
+    # every mount is statted in its own worker,
+    # so a dead network mount can only make itself stale
+    now = time.monotonic()
+    futures: dict[str, Future[sdiskusage]] = {}
+    with _disk_stat_lock:
+        for mountpoint in mountpoints:
+            running = _disk_stat_futures.get(mountpoint)
+            backoff = _disk_usage_backoff.get(mountpoint)
+            backing_off = bool(backoff and now < backoff[0])
+            if running and (running.done() or not backing_off):
+                # started by an overlapping call, or finished after the last timeout
+                futures[mountpoint] = running
+                continue
+            if running or backing_off:
+                # still stuck on the stat that timed out before
+                continue
+            futures[mountpoint] = _disk_stat_futures[mountpoint] = (
+                disk_stat_pool.submit(psutil.disk_usage, mountpoint)
+            )
+    if futures:
+        wait(futures.values(), timeout=config.ps_disk_usage_timeout)
+
+    def get_one(mountpoint: str) -> DiskUsageType | None:
+        future = futures.get(mountpoint)
+        if not (future and future.done()):
+            backoff = _disk_usage_backoff.get(mountpoint)
+            # overlapping calls timing out on the same stat back off only once
+            if future and not (backoff and now < backoff[0]):
+                backoff_disk_usage(mountpoint, now)
+            return get_stale_disk_usage(mountpoint)
 
+        with _disk_stat_lock:
+            if _disk_stat_futures.get(mountpoint) is future:
+                del _disk_stat_futures[mountpoint]
+            _disk_usage_backoff.pop(mountpoint, None)
         try:
-            usage = psutil.disk_usage(mountpoint)
+            usage = future.result()
         except Exception as e:
             # logger.exception(f"读取 {mountpoint} 占用失败")
+            _disk_usage_last.pop(mountpoint, None)
             return (
                 None
                 if config.ps_ignore_bad_parts
                 else DiskUsageWithExc(name=mountpoint, exception=str(e))
             )
 
-        return DiskUsageNormal(
+        res = _disk_usage_last[mountpoint] = DiskUsageNormal(
             name=mountpoint,
             percent=usage.percent,
             used=usage.used,
             total=usage.total,
         )
+        return res
 
-    usage = [x for x in map(get_one, psutil.disk_partitions()) if x]
+    usage = [x for x in map(get_one, mountpoints) if x]
+    for mountpoint in _disk_usage_last.keys() - set(mountpoints):
+        del _disk_usage_last[mountpoint]
     if config.ps_sort_parts:
         usage.sort(
             key=lambda x: x.percent if isinstance(x, DiskUsageNormal) else -1,
@@ -76,8 +336,45 @@ async def get_disk_usage() -> list[DiskUsageType]:
     return usage
 
 
-normal_collector("disk_usage")(get_disk_usage)
-periodic_collector("disk_usage_periodic")(get_disk_usage)
+async def get_disk_usage_sample() -> list[DiskUsageType]:
+    # shared between collectors, copy it to avoid modifying each other
+    return list(await get_raw_sample("disk_usage"))
+
+
+normal_collector("disk_usage")(get_disk_usage_sample)
+# usage of mounts changes slowly
+periodic_collector("disk_usage_periodic", interval=30)(get_disk_usage_sample)
+
+
+@raw_source("disk_io_counters")
+def get_disk_io_counters() -> dict[str, sdiskio]:
+    return psutil.disk_io_counters(perdisk=True)
+
+
+DISK_IO_SORT_KEYS: dict[str, Callable[[DiskIO], float]] = {
+    "bytes": lambda x: x.read + x.write,
+    "iops": lambda x: x.read_iops + x.write_iops,
+    "util": lambda x: x.util or 0,
+}
+
+
+def merge_disk_io(a: DiskIO, b: DiskIO) -> DiskIO:
+    """sum rates of two disks, await is weighted by requests and util is the max"""
+    iops = a.read_iops + a.write_iops + b.read_iops + b.write_iops
+    queue = (a.queue or 0) + (b.queue or 0)
+    return DiskIO(
+        name=a.name,
+        read=a.read + b.read,
+        write=a.write + b.write,
+        read_iops=a.read_iops + b.read_iops,
+        write_iops=a.write_iops + b.write_iops,
+        await_time=(queue * 1000 / iops) if iops else None,
+        queue=queue,
+        util=max(
+            (x for x in (a.util, b.util) if x is not None),
+            default=None,
+        ),
+    )
 
 
 class BaseDiskIOCollector(
@@ -89,28 +386,67 @@ class BaseDiskIOCollector(
         now: dict[str, sdiskio],
         time_passed: float,
     ) -> list[DiskIO]:
-        def calc_one(name: str, past_it: sdiskio, now_it: sdiskio) -> DiskIO | None:
-            if match_list_regexp(config.ps_ignore_disk_ios, name):
-                # logger.info(f"IO统计 磁盘 {name} 匹配 {regex.re.pattern}，忽略")
-                return None
+        ignore_patterns = compile_list_regexp(tuple(config.ps_ignore_disk_ios))
+        groups = compile_group_regexp(tuple(config.ps_disk_io_groups.items()))
 
+        def calc_one(name: str, past_it: sdiskio, now_it: sdiskio) -> DiskIO:
             read = (now_it.read_bytes - past_it.read_bytes) / time_passed
             write = (now_it.write_bytes - past_it.write_bytes) / time_passed
 
-            if read == 0 and write == 0 and config.ps_ignore_no_io_disk:
-                # logger.info(f"IO统计 忽略无IO磁盘 {name}")
-                return None
+            reads = now_it.read_count - past_it.read_count
+            writes = now_it.write_count - past_it.write_count
+            # ms spent by all requests, divided by interval it is the queue depth
+            io_time = (now_it.read_time - past_it.read_time) + (
+                now_it.write_time - past_it.write_time
+            )
+            busy_time = (
+                (now_it.busy_time - past_it.busy_time)
+                if hasattr(now_it, "busy_time")
+                else None
+            )
 
-            return DiskIO(name=name, read=read, write=write)
+            return DiskIO(
+                name=name,
+                read=read,
+                write=write,
+                read_iops=reads / time_passed,
+                write_iops=writes / time_passed,
+                await_time=(io_time / (reads + writes)) if reads + writes else None,
+                queue=io_time / (time_passed * 1000),
+                util=(
+                    min(busy_time / (time_passed * 1000) * 100, 100)
+                    if busy_time is not None
+                    else None
+                ),
+            )
 
-        res = [calc_one(name, past[name], now[name]) for name in past if name in now]
-        res = [x for x in res if x]
-        if config.ps_sort_disk_ios:
-            res.sort(key=lambda x: x.read + x.write, reverse=True)
-        return res
+        # disks matching a group are merged into one item named after the group
+        res: dict[str, DiskIO] = {}
+        for name, past_it in past.items():
+            if (now_it := now.get(name)) is None:
+                continue
+            if match_compiled_list(ignore_patterns, name):
+                # logger.info(f"IO统计 磁盘 {name} 匹配 {regex.re.pattern}，忽略")
+                continue
+            it = calc_one(name, past_it, now_it)
+            key = match_group(groups, name) or name
+            res[key] = (
+                merge_disk_io(res[key], it) if key in res else replace(it, name=key)
+            )
+
+        items = list(res.values())
+        if config.ps_ignore_no_io_disk:
+            # logger.info(f"IO统计 忽略无IO磁盘 {name}")
+            items = [x for x in items if x.read or x.write]
+        return top_n(
+            items,
+            config.ps_disk_ios_len,
+            key=DISK_IO_SORT_KEYS[config.ps_sort_disk_ios_by],
+            sort=config.ps_sort_disk_ios,
+        )
 
     async def _get_obj(self) -> dict[str, sdiskio]:
-        return psutil.disk_io_counters(perdisk=True)
+        return await get_raw_sample("disk_io_counters")
 
 
 @collector("disk_io")
@@ -2,7 +2,23 @@ from dataclasses import dataclass
 
 import psutil
 
-from . import normal_collector, periodic_collector
+from . import (
+    get_raw_sample,
+    normal_collector,
+    numeric_periodic_collector,
+    periodic_collector,
+    raw_source,
+)
+
+
+@raw_source("virtual_memory", blocking=False)
+def get_raw_virtual_memory():
+    return psutil.virtual_memory()
+
+
+@raw_source("swap_memory", blocking=False)
+def get_raw_swap_memory():
+    return psutil.swap_memory()
 
 
 @dataclass
@@ -13,7 +29,7 @@ class MemoryStat:
 
 
 async def get_memory_stat() -> MemoryStat:
-    mem = psutil.virtual_memory()
+    mem = await get_raw_sample("virtual_memory")
     return MemoryStat(percent=mem.percent, used=mem.used, total=mem.total)
 
 
@@ -21,10 +37,25 @@ normal_collector("memory_stat")(get_memory_stat)
 periodic_collector("memory_stat_periodic")(get_memory_stat)
 
 
+@numeric_periodic_collector()
+async def memory_percent_series() -> float:
+    return (await get_raw_sample("virtual_memory")).percent
+
+
+@numeric_periodic_collector()
+async def memory_used_series() -> float:
+    return (await get_raw_sample("virtual_memory")).used
+
+
 async def get_swap_stat() -> MemoryStat:
-    swap = psutil.swap_memory()
+    swap = await get_raw_sample("swap_memory")
     return MemoryStat(percent=swap.percent, used=swap.used, total=swap.total)
 
 
 normal_collector("swap_stat")(get_swap_stat)
 periodic_collector("swap_stat_periodic")(get_swap_stat)
+
+
+@numeric_periodic_collector()
+async def swap_percent_series() -> float:
+    return (await get_raw_sample("swap_memory")).percent
@@ -1,22 +1,40 @@
 import asyncio
+import importlib.util
 import time
 from dataclasses import dataclass
-from typing import TypeAlias
+from functools import cache
+from typing import TYPE_CHECKING, TypeAlias
 
 import psutil
-from httpx import AsyncClient, ReadTimeout
+from nonebot import get_driver, logger
+from nonebot_plugin_apscheduler import scheduler
 from psutil._common import snetio
 
 from ..config import TestSiteCfg, config
-from ..util import match_list_regexp
+from ..util import (
+    compile_group_regexp,
+    compile_list_regexp,
+    match_compiled_list,
+    match_group,
+    top_n,
+)
 from . import (
+    BaseNumericMapPeriodicCollector,
     BaseTimeBasedCounterCollector,
     NormalTimeBasedCounterCollector,
     PeriodicTimeBasedCounterCollector,
     collector,
+    enabled_collectors,
+    enabled_hooks,
+    get_raw_sample,
+    is_idle,
     normal_collector,
+    raw_source,
 )
 
+if TYPE_CHECKING:
+    from httpx import AsyncClient, Response
+
 
 @dataclass
 class NetworkIO:
@@ -31,6 +49,9 @@ class NetworkConnectionOK:
     status: int
     reason: str
     delay: float
+    """request time on a warm (kept alive) connection, in ms"""
+    cold_delay: float | None = None
+    """request time on a new connection, only measured when enabled, in ms"""
 
 
 @dataclass
@@ -42,6 +63,44 @@ class NetworkConnectionError:
 NetworkConnectionType: TypeAlias = NetworkConnectionOK | NetworkConnectionError
 
 
+@raw_source("net_io_counters")
+def get_net_io_counters() -> dict[str, snetio]:
+    return psutil.net_io_counters(pernic=True)
+
+
+def calc_network_io(
+    past: dict[str, snetio],
+    now: dict[str, snetio],
+    time_passed: float,
+) -> list[NetworkIO]:
+    ignore_patterns = compile_list_regexp(tuple(config.ps_ignore_nets))
+    groups = compile_group_regexp(tuple(config.ps_net_groups.items()))
+
+    # nics matching a group are summed into one item named after the group
+    res: dict[str, NetworkIO] = {}
+    for name, past_it in past.items():
+        if (now_it := now.get(name)) is None:
+            continue
+        if match_compiled_list(ignore_patterns, name):
+            # logger.info(f"网卡IO统计 {name} 匹配 {regex.re.pattern}，忽略")
+            continue
+
+        sent = (now_it.bytes_sent - past_it.bytes_sent) / time_passed
+        recv = (now_it.bytes_recv - past_it.bytes_recv) / time_passed
+
+        key = match_group(groups, name) or name
+        if x := res.get(key):
+            x.sent += sent
+            x.recv += recv
+        else:
+            res[key] = NetworkIO(name=key, sent=sent, recv=recv)
+
+    if config.ps_ignore_0b_net:
+        # logger.info(f"网卡IO统计 忽略无IO网卡 {name}")
+        return [x for x in res.values() if x.sent or x.recv]
+    return list(res.values())
+
+
 class BaseNetworkIOCollector(
     BaseTimeBasedCounterCollector[dict[str, snetio], list[NetworkIO]],
 ):
@@ -51,28 +110,15 @@ class BaseNetworkIOCollector(
         now: dict[str, snetio],
         time_passed: float,
     ) -> list[NetworkIO]:
-        def calc_one(name: str, past_it: snetio, now_it: snetio) -> NetworkIO | None:
-            if match_list_regexp(config.ps_ignore_nets, name):
-                # logger.info(f"网卡IO统计 {name} 匹配 {regex.re.pattern}，忽略")
-                return None
-
-            sent = (now_it.bytes_sent - past_it.bytes_sent) / time_passed
-            recv = (now_it.bytes_recv - past_it.bytes_recv) / time_passed
-
-            if sent == 0 and recv == 0 and config.ps_ignore_0b_net:
-                # logger.info(f"网卡IO统计 忽略无IO网卡 {name}")
-                return None
-
-            return NetworkIO(name=name, sent=sent, recv=recv)
-
-        res = [calc_one(name, past[name], now[name]) for name in past if name in now]
-        res = [x for x in res if x]
-        if config.ps_sort_nets:
-            res.sort(key=lambda x: x.sent + x.recv, reverse=True)
-        return res
+        return top_n(
+            calc_network_io(past, now, time_passed),
+            config.ps_nets_len,
+            key=lambda x: x.sent + x.recv,
+            sort=config.ps_sort_nets,
+        )
 
     async def _get_obj(self) -> dict[str, snetio]:
-        return psutil.net_io_counters(pernic=True)
+        return await get_raw_sample("net_io_counters")
 
 
 @collector("network_io")
@@ -89,25 +135,142 @@ class PeriodicDiskIOCollector(
 ): ...
 
 
+# keys are `{nic}.sent` and `{nic}.recv`
+@collector("network_io_series")
+class NetworkIOSeriesCollector(
+    BaseTimeBasedCounterCollector[dict[str, snetio], dict[str, float]],
+    BaseNumericMapPeriodicCollector,
+):
+    async def _calc(
+        self,
+        past: dict[str, snetio],
+        now: dict[str, snetio],
+        time_passed: float,
+    ) -> dict[str, float]:
+        res: dict[str, float] = {}
+        for x in calc_network_io(past, now, time_passed):
+            res[f"{x.name}.sent"] = x.sent
+            res[f"{x.name}.recv"] = x.recv
+        return res
+
+    async def _get_obj(self) -> dict[str, snetio]:
+        return await get_raw_sample("net_io_counters")
+
+
+# proxy -> client shared by site tests, connections are kept alive between tests
+_http_clients: dict[str | None, "AsyncClient"] = {}
+# site url -> time until which its pooled connection is considered warm
+_warm_until: dict[str, float] = {}
+_warm_up_tasks: set[asyncio.Task] = set()
+
+
+@cache
+def use_http2() -> bool:
+    if not config.ps_test_http2:
+        return False
+    if importlib.util.find_spec("h2") is None:
+        logger.warning("Package h2 is not installed, site tests will use HTTP/1.1")
+        return False
+    return True
+
+
+def get_site_proxy(site: TestSiteCfg) -> str | None:
+    return config.proxy if site.use_proxy else None
+
+
+def create_http_client(proxy: str | None) -> "AsyncClient":
+    from httpx import AsyncClient, Limits
+
+    return AsyncClient(
+        timeout=config.ps_test_timeout,
+        proxy=proxy,
+        follow_redirects=True,
+        http2=use_http2(),
+        limits=Limits(keepalive_expiry=config.ps_test_keepalive),
+    )
+
+
+def get_http_client(proxy: str | None) -> "AsyncClient":
+    if (client := _http_clients.get(proxy)) is None or client.is_closed:
+        client = _http_clients[proxy] = create_http_client(proxy)
+    return client
+
+
+async def timed_get(client: "AsyncClient", url: str) -> tuple["Response", float]:
+    start = time.perf_counter()
+    resp = await client.get(url)
+    return resp, (time.perf_counter() - start) * 1000
+
+
+def mark_warm(url: str):
+    # keep warm job refreshes the connection before servers close it as idle,
+    # tolerate one late run of the job
+    _warm_until[url] = time.monotonic() + config.ps_test_keep_warm_interval * 2
+
+
+async def warm_up_site(site: TestSiteCfg):
+    url = str(site.url)
+    # only the connection is needed, do not download the page
+    await get_http_client(get_site_proxy(site)).head(url)
+    mark_warm(url)
+
+
+async def keep_warm_sites():
+    async def warm_up(site: TestSiteCfg):
+        try:
+            await warm_up_site(site)
+        except Exception as e:
+            logger.debug(f"Failed to warm up connection to {site.url}: {e!r}")
+
+    await asyncio.gather(*map(warm_up, config.ps_test_sites))
+
+
+async def keep_warm_job():
+    # nobody is using the command, let the connections go
+    if is_idle():
+        return
+    await keep_warm_sites()
+
+
+async def test_warm_delay(site: TestSiteCfg) -> tuple["Response", float]:
+    url = str(site.url)
+    if _warm_until.get(url, 0) <= time.monotonic():
+        # connect first, so delay does not include dns, tcp and tls setup
+        await warm_up_site(site)
+    res = await timed_get(get_http_client(get_site_proxy(site)), url)
+    mark_warm(url)
+    return res
+
+
+async def test_cold_delay(site: TestSiteCfg) -> float | None:
+    if not config.ps_test_cold_delay:
+        return None
+    try:
+        async with create_http_client(get_site_proxy(site)) as client:
+            _, delay = await timed_get(client, str(site.url))
+    except Exception:
+        return None
+    return delay
+
+
 @normal_collector()
 async def network_connection() -> list[NetworkConnectionType]:
+    from httpx import ReadTimeout
+
     def format_conn_error(error: Exception) -> str:
-        if isinstance(error, ReadTimeout):
+        if isinstance(error, (ReadTimeout, asyncio.TimeoutError)):
             return "超时"
         return error.__class__.__name__
 
     async def test_one(site: TestSiteCfg) -> NetworkConnectionType:
         try:
-            async with AsyncClient(
-                timeout=config.ps_test_timeout,
-                proxy=config.proxy if site.use_proxy else None,
-                follow_redirects=True,
-            ) as client:
-                start = time.time()
-                resp = await client.get(str(site.url))
-                delay = (time.time() - start) * 1000
-
+            # warm up, warm and cold requests together never exceed the timeout
+            (resp, delay), cold_delay = await asyncio.wait_for(
+                asyncio.gather(test_warm_delay(site), test_cold_delay(site)),
+                config.ps_test_timeout,
+            )
         except Exception as e:
+            _warm_until.pop(str(site.url), None)
             return NetworkConnectionError(name=site.name, error=format_conn_error(e))
 
         return NetworkConnectionOK(
@@ -115,6 +278,7 @@ async def network_connection() -> list[NetworkConnectionType]:
             status=resp.status_code,
             reason=resp.reason_phrase,
             delay=delay,
+            cold_delay=cold_delay,
         )
 
     res = await asyncio.gather(*map(test_one, config.ps_test_sites))
@@ -122,3 +286,38 @@ async def network_connection() -> list[NetworkConnectionType]:
         res.sort(key=lambda x: x.delay if isinstance(x, NetworkConnectionOK) else -1)
 
     return res
+
+
+async def setup_http_clients():
+    if "network_connection" not in enabled_collectors:
+        return
+
+    for proxy in {get_site_proxy(x) for x in config.ps_test_sites}:
+        get_http_client(proxy)
+
+    # warm up in background, so the first command already measures warm delay
+    task = asyncio.create_task(keep_warm_sites())
+    _warm_up_tasks.add(task)
+    task.add_done_callback(_warm_up_tasks.discard)
+
+    if config.ps_test_keep_warm_interval > 0:
+        scheduler.add_job(
+            keep_warm_job,
+            "interval",
+            seconds=config.ps_test_keep_warm_interval,
+            max_instances=1,
+            coalesce=True,
+        )
+
+
+enabled_hooks.append(setup_http_clients)
+
+
+@get_driver().on_shutdown
+async def _():
+    for task in _warm_up_tasks.copy():
+        task.cancel()
+    clients = list(_http_clients.values())
+    _http_clients.clear()
+    for client in clients:
+        await client.aclose()
@@ -1,12 +1,21 @@
-import asyncio
+import heapq
+import os
+import re
+import sys
+import threading
+import time
+from collections.abc import Iterator
 from dataclasses import dataclass
-from typing import cast
+from pathlib import Path
+from typing import Any, TypeVar
 
 import psutil
 
 from ..config import config
-from ..util import match_list_regexp
-from . import normal_collector, periodic_collector
+from ..util import compile_list_regexp, match_compiled_list
+from . import get_raw_sample, normal_collector, periodic_collector, raw_source
+
+T = TypeVar("T", int, float)
 
 
 @dataclass
@@ -14,48 +23,536 @@ class ProcessStatus:
     name: str
     cpu: float
     mem: int
+    count: int = 1
+    """number of processes aggregated into this item"""
+    io: float | None = None
+    """disk read and write bytes per second"""
+    threads: int | None = None
+    fds: int | None = None
+    uss: int | None = None
+    pss: int | None = None
+
+
+PROC_ATTRS = ["name", "cpu_percent", "memory_info"]
+GROUP_BY_EXTRA_ATTRS = {
+    "parent": ["ppid"],
+    "cgroup": ["create_time"],
+}
+METRIC_EXTRA_ATTRS = {
+    "io": ["io_counters", "create_time"],
+    "threads": ["num_threads"],
+    "fds": ["num_fds"],
+}
+FULL_MEMORY_METRICS = {"uss", "pss"}
+# memory_full_info is expensive, so uss / pss are only read for
+# this many times of ps_proc_len candidates picked by rss
+FULL_MEMORY_CANDIDATE_FACTOR = 3
+
+CONTAINER_ID_REGEXP = re.compile(
+    r"^(?:docker|cri-containerd|crio|libpod)?-?(?P<id>[0-9a-f]{64})(?:\.scope)?$",
+)
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+# handles of processes in scope, cpu_percent is relative to the last call
+_scoped_proc_cache: dict[int, psutil.Process] = {}
+# pid -> (create time, cgroup name), pids can be reused so create time is checked
+_cgroup_cache: dict[int, tuple[float, str]] = {}
+# pid -> (create time, sample time, read + write bytes)
+_io_cache: dict[int, tuple[float, float, int]] = {}
+
+
+def read_proc_cgroup(pid: int) -> str | None:
+    try:
+        with open(f"/proc/{pid}/cgroup", encoding="u8") as f:  # noqa: PTH123
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+
+    paths: dict[str, str] = {}
+    for line in lines:
+        _, controllers, path = line.split(":", 2)
+        for x in controllers.split(",") if controllers else ("",):
+            paths[x] = path
+    # unified hierarchy (cgroup v2) first, then memory controller of v1
+    return paths.get("") or paths.get("memory") or next(iter(paths.values()), None)
+
+
+def format_cgroup_name(path: str) -> str:
+    base = path.rstrip("/").rsplit("/", 1)[-1]
+    if not base:
+        return "/"
+    if m := CONTAINER_ID_REGEXP.match(base):
+        return m["id"][:12]
+    return base.removesuffix(".scope")
+
+
+def get_cgroup_name(pid: int, create_time: float | None) -> str:
+    if (cached := _cgroup_cache.get(pid)) and cached[0] == create_time:
+        return cached[1]
+    path = read_proc_cgroup(pid)
+    name = format_cgroup_name(path) if path else "-"
+    if create_time is not None:
+        _cgroup_cache[pid] = (create_time, name)
+    return name
+
+
+def resolve_cgroup_dir(path: str) -> Path:
+    if path == "self":
+        path = read_proc_cgroup(os.getpid()) or "/"
+    if (p := Path(path)).is_relative_to(CGROUP_ROOT):
+        return p
+    # cgroup v1 paths read from /proc/<pid>/cgroup are of memory controller
+    unified = (CGROUP_ROOT / "cgroup.controllers").exists()
+    return (CGROUP_ROOT if unified else CGROUP_ROOT / "memory") / path.lstrip("/")
+
+
+def read_cgroup_pids(path: str) -> set[int]:
+    """pids in the cgroup and all of its child cgroups"""
+    root = resolve_cgroup_dir(path)
+    pids: set[int] = set()
+    # raise when the cgroup itself is not readable
+    pids.update(map(int, (root / "cgroup.procs").read_text().split()))
+    for dir_path, dir_names, _ in os.walk(root):
+        for name in dir_names:
+            try:
+                text = (Path(dir_path) / name / "cgroup.procs").read_text()
+            except OSError:
+                continue
+            pids.update(map(int, text.split()))
+    return pids
+
+
+def read_pid_subtree(pid: int) -> set[int]:
+    """pid itself and all of its descendants"""
+    if not Path(f"/proc/{pid}/task/{pid}/children").exists():
+        # kernel without CONFIG_PROC_CHILDREN or not Linux
+        try:
+            children = psutil.Process(pid).children(recursive=True)
+        except psutil.NoSuchProcess:
+            return set()
+        return {pid, *(x.pid for x in children)}
+
+    pids: set[int] = set()
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        if current in pids:
+            continue
+        pids.add(current)
+        try:
+            tasks = os.listdir(f"/proc/{current}/task")
+        except OSError:
+            continue
+        for tid in tasks:
+            try:
+                text = Path(f"/proc/{current}/task/{tid}/children").read_text()
+            except OSError:
+                continue
+            stack.extend(map(int, text.split()))
+    return pids
+
 
+def filter_pids_by_uid(pids: set[int] | None, uids: set[int]) -> set[int]:
+    if not sys.platform.startswith("linux"):
+        return {
+            x.pid
+            for x in psutil.process_iter(["uids"], ad_value=None)
+            if (pids is None or x.pid in pids)
+            and x.info["uids"]
+            and x.info["uids"].real in uids
+        }
 
-async def get_process_status() -> list[ProcessStatus]:
+    if pids is None:
+        pids = {int(x) for x in os.listdir("/proc") if x.isdigit()}
+    res: set[int] = set()
+    for pid in pids:
+        # owner of /proc/<pid> is the effective uid of the process
+        try:
+            if os.stat(f"/proc/{pid}").st_uid in uids:
+                res.add(pid)
+        except OSError:
+            continue
+    return res
+
+
+def get_scoped_pids() -> set[int] | None:
+    """pids matching all configured scopes, None when no scope is configured"""
+    pids: set[int] | None = None
+    if config.ps_proc_scope_cgroup:
+        pids = read_cgroup_pids(config.ps_proc_scope_cgroup)
+    if scope_pid := config.ps_proc_scope_pid:
+        subtree = read_pid_subtree(os.getpid() if scope_pid == "self" else scope_pid)
+        pids = subtree if pids is None else pids & subtree
+    if config.ps_proc_scope_uids:
+        # stat only pids already in scope when possible
+        pids = filter_pids_by_uid(pids, config.ps_proc_scope_uids)
+    return pids
+
+
+def iter_processes(attrs: list[str]) -> Iterator[psutil.Process]:
+    """
+    like `psutil.process_iter`,
+    but only walks pids in configured scope when there is one
+    """
+    pids = get_scoped_pids()
+    if pids is None:
+        yield from psutil.process_iter(attrs=attrs, ad_value=None)
+        return
+
+    for pid in _scoped_proc_cache.keys() - pids:
+        del _scoped_proc_cache[pid]
+    for pid in pids:
+        proc = _scoped_proc_cache.get(pid)
+        try:
+            if (not proc) or (not proc.is_running()):
+                proc = _scoped_proc_cache[pid] = psutil.Process(pid)
+            proc.info = proc.as_dict(attrs, ad_value=None)  # type: ignore
+        except psutil.NoSuchProcess:
+            _scoped_proc_cache.pop(pid, None)
+            continue
+        yield proc
+
+
+def get_io_rate(pid: int, info: dict[str, Any], now: float) -> float | None:
+    counters = info["io_counters"]
+    create_time = info["create_time"]
+    if counters is None or create_time is None:
+        return None
+    total = counters.read_bytes + counters.write_bytes
+    last = _io_cache.get(pid)
+    _io_cache[pid] = (create_time, now, total)
+    if (not last) or last[0] != create_time or now <= last[1]:
+        return None
+    return max(total - last[2], 0) / (now - last[1])
+
+
+def add_optional(a: T | None, b: T | None) -> T | None:
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return a + b
+
+
+def merge_status(group: ProcessStatus, other: ProcessStatus):
+    group.cpu += other.cpu
+    group.mem += other.mem
+    group.count += other.count
+    group.io = add_optional(group.io, other.io)
+    group.threads = add_optional(group.threads, other.threads)
+    group.fds = add_optional(group.fds, other.fds)
+
+
+# parents under which every child starts its own tree
+TREE_ROOT_PARENTS = {0, 1, os.getpid()}
+
+
+def find_tree_root(pid: int, parents: dict[int, int], roots: dict[int, int]) -> int:
+    """
+    topmost ancestor of the process whose parent is init, the bot itself,
+    or not scanned, `roots` caches results of previous calls
+    """
+    path: list[int] = []
+    visited: set[int] = set()
+    while True:
+        if (root := roots.get(pid)) is not None:
+            break
+        ppid = parents.get(pid)
+        if (
+            pid in TREE_ROOT_PARENTS
+            or ppid is None
+            or ppid in TREE_ROOT_PARENTS
+            or ppid in visited  # reused pids may form a loop
+        ):
+            root = pid
+            break
+        path.append(pid)
+        visited.add(pid)
+        pid = ppid
+    for x in path:
+        roots[x] = root
+    roots[pid] = root
+    return root
+
+
+def fill_full_memory(items: list[tuple[ProcessStatus, Any]]):
+    for status, proc in items:
+        try:
+            mem_info = proc.memory_full_info()
+        except (psutil.Error, AttributeError):
+            continue
+        status.uss = getattr(mem_info, "uss", None)
+        status.pss = getattr(mem_info, "pss", None)
+
+
+def scan_processes() -> list[ProcessStatus]:
     if not config.ps_proc_len:
         return []
 
-    async def parse_one(proc: psutil.Process) -> ProcessStatus | None:
-        name = proc.name()
-        if match_list_regexp(config.ps_ignore_procs, name):
-            # logger.info(f"进程 {name} 匹配 {regex.re.pattern}，忽略")
-            return None
-
-        # proc.cpu_percent()
-        # await asyncio.sleep(1)
-        cpu_count = psutil.cpu_count()
-        with proc.oneshot():
-            cpu = proc.cpu_percent()
-            cpu = (
-                (cpu / cpu_count) if config.ps_proc_cpu_max_100p and cpu_count else cpu
-            )
-            mem: int = proc.memory_info().rss
-
-        return ProcessStatus(name=name, cpu=cpu, mem=mem)
-
-    def sorter(x: ProcessStatus):
-        sort_by = config.ps_proc_sort_by
-        if sort_by == "mem":
-            return x.mem
-        # if sort_by == "cpu":
-        return x.cpu
-
-    proc_list = cast(
-        "list[ProcessStatus | None | Exception]",
-        await asyncio.gather(
-            *(parse_one(proc) for proc in psutil.process_iter()),
-            return_exceptions=True,
+    ignore_patterns = compile_list_regexp(tuple(config.ps_ignore_procs))
+    cpu_count = psutil.cpu_count() if config.ps_proc_cpu_max_100p else None
+    sort_by = config.ps_proc_sort_by
+    group_by = config.ps_proc_group_by
+    metrics = {sort_by, *config.ps_proc_extra_columns}
+    attrs = list(
+        dict.fromkeys(
+            [
+                *PROC_ATTRS,
+                *GROUP_BY_EXTRA_ATTRS.get(group_by, ()),
+                *(x for m in metrics for x in METRIC_EXTRA_ATTRS.get(m, ())),
+            ],
         ),
     )
-    proc_list = [x for x in proc_list if x and (not isinstance(x, Exception))]
-    proc_list.sort(key=sorter, reverse=True)
-    return proc_list[: config.ps_proc_len]
+    with_io = "io" in metrics
+    now = time.monotonic()
+    seen_pids: set[int] = set()
+    # pid -> ppid and name of every scanned process, ignored ones included,
+    # so trees can be rolled up through them after the scan
+    parents: dict[int, int] = {}
+    names: dict[int, str] = {}
+
+    def sort_value(cpu: float, mem: int, info: dict[str, Any]) -> float:
+        if sort_by == "cpu":
+            return cpu
+        if sort_by == "io":
+            return info["io_rate"] or 0
+        if sort_by == "threads":
+            return info["num_threads"] or 0
+        if sort_by == "fds":
+            return info["num_fds"] or 0
+        # uss / pss candidates are picked by rss first
+        return mem
+
+    # only build lightweight tuples here,
+    # ProcessStatus is created for the top N items (or for groups) only
+    def iter_candidates():
+        for proc in iter_processes(attrs):
+            info = proc.info
+            name: str | None = info["name"]
+            if group_by == "parent" and (ppid := info["ppid"]) is not None:
+                parents[proc.pid] = ppid
+                names[proc.pid] = name or ""
+            cpu: float | None = info["cpu_percent"]
+            mem_info = info["memory_info"]
+            if (not name) or (cpu is None) or (mem_info is None):
+                continue
+            if match_compiled_list(ignore_patterns, name):
+                # logger.info(f"进程 {name} 匹配 {regex.re.pattern}，忽略")
+                continue
+            if cpu_count:
+                cpu = cpu / cpu_count
+            mem: int = mem_info.rss
+            if with_io:
+                # rate of every process is updated, so counters of a process
+                # just entering the top list are already cached
+                seen_pids.add(proc.pid)
+                info["io_rate"] = get_io_rate(proc.pid, info, now)
+            yield (sort_value(cpu, mem, info), name, cpu, mem, proc)
+
+    def make_status(name: str, cpu: float, mem: int, info: dict[str, Any]):
+        return ProcessStatus(
+            name=name,
+            cpu=cpu,
+            mem=mem,
+            io=info.get("io_rate"),
+            threads=info.get("num_threads"),
+            fds=info.get("num_fds"),
+        )
+
+    def prune_io_cache():
+        if with_io:
+            for pid in _io_cache.keys() - seen_pids:
+                del _io_cache[pid]
+
+    if group_by == "none":
+        full_memory = bool(metrics & FULL_MEMORY_METRICS)
+        sort_by_full_memory = sort_by in FULL_MEMORY_METRICS
+        top = [
+            (make_status(name, cpu, mem, proc.info), proc)
+            for _, name, cpu, mem, proc in heapq.nlargest(
+                config.ps_proc_len
+                * (FULL_MEMORY_CANDIDATE_FACTOR if sort_by_full_memory else 1),
+                iter_candidates(),
+                key=lambda x: x[0],
+            )
+        ]
+        prune_io_cache()
+        if full_memory:
+            fill_full_memory(top)
+        if sort_by_full_memory:
+            top = heapq.nlargest(
+                config.ps_proc_len,
+                top,
+                key=lambda x: getattr(x[0], sort_by) or 0,
+            )
+        return [x for x, _ in top]
+
+    groups: dict[Any, ProcessStatus] = {}
+    cgroup_seen_pids: set[int] = set()
+    for _, name, cpu, mem, proc in iter_candidates():
+        info = proc.info
+        if group_by == "parent":
+            # an ancestor may come later in the scan, processes are rolled up
+            # to their tree root after it
+            key = proc.pid
+        elif group_by == "cgroup":
+            cgroup_seen_pids.add(proc.pid)
+            key = get_cgroup_name(proc.pid, info["create_time"])
+        else:
+            key = name
+
+        status = make_status(str(key), cpu, mem, info)
+        if group := groups.get(key):
+            merge_status(group, status)
+        else:
+            groups[key] = status
+
+    prune_io_cache()
+    if group_by == "cgroup":
+        for pid in _cgroup_cache.keys() - cgroup_seen_pids:
+            del _cgroup_cache[pid]
+    if group_by == "parent":
+        trees: dict[int, ProcessStatus] = {}
+        roots: dict[int, int] = {}
+        for pid, status in groups.items():
+            root = find_tree_root(pid, parents, roots)
+            if tree := trees.get(root):
+                merge_status(tree, status)
+            else:
+                trees[root] = status
+        groups = trees  # type: ignore
+
+    # uss / pss are not collected for groups, rss is used to sort instead
+    group_sort_attr = "mem" if sort_by in FULL_MEMORY_METRICS else sort_by
+    top = heapq.nlargest(
+        config.ps_proc_len,
+        groups.items(),
+        key=lambda x: getattr(x[1], group_sort_attr) or 0,
+    )
+    if group_by == "parent":
+        for root, group in top:
+            group.name = names.get(root) or f"PID {root}"
+    return [x for _, x in top]
+
+
+# command and periodic scans may overlap in different worker threads,
+# both mutate the caches above and would break each other's io rate baseline
+_scan_lock = threading.Lock()
+
+
+# per process cpu percent is also relative to the last call
+@raw_source("process_status")
+def get_process_status() -> list[ProcessStatus]:
+    with _scan_lock:
+        return scan_processes()
+
+
+async def get_process_status_sample() -> list[ProcessStatus]:
+    return list(await get_raw_sample("process_status"))
+
+
+normal_collector("process_status")(get_process_status_sample)
+# scanning every process is expensive and the list changes slowly
+periodic_collector("process_status_periodic", interval=15)(get_process_status_sample)
+
+
+@dataclass
+class ProcessTreeStatus:
+    cpu: float
+    mem: int
+    threads: int
+    fds: int | None
+    count: int
+
+
+@dataclass
+class SelfStatus:
+    bot: ProcessTreeStatus
+    """the bot process itself"""
+    children: ProcessTreeStatus
+    """descendants of the bot process, mainly the browser launched by htmlrender"""
+    children_mem_growth: int
+    """memory growth of descendants since they were first seen"""
+
+
+class SelfProcessTracker:
+    """
+    keeps `psutil.Process` handles of the bot process and its descendants,
+    `cpu_percent` is relative to the last call on the same handle
+    """
+
+    def __init__(self) -> None:
+        self.proc = psutil.Process()
+        self.handles: dict[int, psutil.Process] = {}
+        self.children_mem_base: int | None = None
+
+    def _refresh_children(self) -> list[psutil.Process]:
+        children = self.proc.children(recursive=True)
+        handles: dict[int, psutil.Process] = {}
+        for proc in children:
+            # psutil compares pid and create time, so a reused pid gets a new handle
+            cached = self.handles.get(proc.pid)
+            handles[proc.pid] = cached if cached == proc else proc
+        self.handles = handles
+        return list(handles.values())
+
+    def _stat(self, procs: list[psutil.Process]) -> ProcessTreeStatus:
+        cpu_count = psutil.cpu_count() if config.ps_proc_cpu_max_100p else None
+        cpu = 0.0
+        mem = threads = count = 0
+        fds: int | None = 0
+        for proc in procs:
+            try:
+                with proc.oneshot():
+                    cpu += proc.cpu_percent()
+                    mem += proc.memory_info().rss
+                    threads += proc.num_threads()
+                    if fds is not None:
+                        try:
+                            fds += proc.num_fds()
+                        except (AttributeError, psutil.AccessDenied):
+                            # num_fds is not available on Windows
+                            fds = None
+            except psutil.Error:
+                continue
+            count += 1
+        if cpu_count:
+            cpu = cpu / cpu_count
+        return ProcessTreeStatus(
+            cpu=cpu,
+            mem=mem,
+            threads=threads,
+            fds=fds,
+            count=count,
+        )
+
+    def get(self) -> SelfStatus:
+        bot = self._stat([self.proc])
+        children = self._stat(self._refresh_children())
+        if not children.count:
+            # browser closed, next one gets a new base
+            self.children_mem_base = None
+        elif self.children_mem_base is None:
+            self.children_mem_base = children.mem
+        return SelfStatus(
+            bot=bot,
+            children=children,
+            children_mem_growth=children.mem - (self.children_mem_base or 0),
+        )
+
+
+self_process_tracker = SelfProcessTracker()
+
+
+@raw_source("self_status")
+def get_self_status() -> SelfStatus:
+    return self_process_tracker.get()
+
+
+async def get_self_status_sample() -> SelfStatus:
+    return await get_raw_sample("self_status")
 
 
-normal_collector("process_status")(get_process_status)
-periodic_collector("process_status_periodic")(get_process_status)
+normal_collector("self_status")(get_self_status_sample)
+periodic_collector("self_status_periodic", interval=15)(get_self_status_sample)
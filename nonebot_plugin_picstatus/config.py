@@ -3,14 +3,18 @@ from pathlib import Path
 from typing import Literal
 
 from cookit.nonebot.localstore import ensure_localstore_path_config
+from cookit.pyd import field_validator
 from nonebot import get_plugin_config
 from nonebot.compat import type_validate_python
-from nonebot_plugin_localstore import get_plugin_cache_dir
+from nonebot_plugin_localstore import get_plugin_cache_dir, get_plugin_data_dir
 from pydantic import AnyHttpUrl, BaseModel, Field
 
 ensure_localstore_path_config()
 
 CACHE_DIR = get_plugin_cache_dir()
+DATA_DIR = get_plugin_data_dir()
+HISTORY_DB_PATH = DATA_DIR / "history.db"
+CPU_BRAND_CACHE_PATH = DATA_DIR / "cpu_brand.json"
 
 BG_PRELOAD_CACHE_DIR = CACHE_DIR / "bg_preload"
 if BG_PRELOAD_CACHE_DIR.exists():
@@ -23,7 +27,10 @@ TEMPLATE_PATH = RES_PATH / "templates"
 DEFAULT_BG_PATH = ASSETS_PATH / "default_bg.webp"
 DEFAULT_AVATAR_PATH = ASSETS_PATH / "default_avatar.webp"
 
-ProcSortByType = Literal["cpu", "mem"]
+ProcSortByType = Literal["cpu", "mem", "io", "threads", "fds", "uss", "pss"]
+ProcColumnType = Literal["io", "threads", "fds", "uss", "pss"]
+ProcGroupByType = Literal["none", "name", "parent", "cgroup"]
+DiskIOSortByType = Literal["bytes", "iops", "util"]
 
 
 class TestSiteCfg(BaseModel):
@@ -61,9 +68,27 @@ class ConfigModel(BaseModel):
 
     # region collectors
     # region base
-    ps_collect_interval: int = 5
+    ps_collect_interval: float = 5
     ps_default_collect_cache_size: int = 1
     ps_collect_cache_size: dict[str, int] = Field(default_factory=dict)
+    ps_collect_intervals: dict[str, float] = Field(default_factory=dict)
+    ps_collect_jitter: float = 0.5
+    ps_collect_idle_after: float | None = 600
+    ps_collect_idle_interval: float = 60
+    ps_collect_idle_history_interval: float = 15
+    ps_collect_reuse_window: float = 1
+    ps_history_enabled: bool = False
+    ps_history_flush_interval: float = 60
+    ps_history_raw_retention: int = 3600
+    ps_history_minute_retention: int = 86400
+    ps_history_hour_retention: int = 2592000
+    ps_counter_keep_baseline: bool = True
+    ps_counter_baseline_max_age: float = 60
+    ps_counter_baseline_refresh: bool = True
+    ps_blocking_workers: int = 4
+    ps_procfs_backend: bool = False
+    ps_collect_timeout: float | None = 10
+    ps_collector_timeouts: dict[str, float] = Field(default_factory=dict)
     # endregion
 
     # region header
@@ -80,10 +105,16 @@ class ConfigModel(BaseModel):
     ps_ignore_bad_parts: bool = False
     ps_sort_parts: bool = True
     ps_sort_parts_reverse: bool = False
+    ps_disk_usage_timeout: float = 3
+    ps_disk_usage_backoff: float = 60
+    ps_disk_usage_backoff_max: float = 3600
     # io
     ps_ignore_disk_ios: list[str] = [r"^(loop|zram)\d*$"]
     ps_ignore_no_io_disk: bool = False
     ps_sort_disk_ios: bool = True
+    ps_sort_disk_ios_by: DiskIOSortByType = "bytes"
+    ps_disk_io_groups: dict[str, str] = {}
+    ps_disk_ios_len: int = 0
     # endregion
 
     # region network
@@ -91,6 +122,8 @@ class ConfigModel(BaseModel):
     ps_ignore_nets: list[str] = [r"^lo(op)?\d*$|^(Loopback|本地连接)"]
     ps_ignore_0b_net: bool = False
     ps_sort_nets: bool = True
+    ps_net_groups: dict[str, str] = {}
+    ps_nets_len: int = 0
     # connection_test
     ps_test_sites: list[TestSiteCfg] = [  # v1 compat #59
         type_validate_python(
@@ -104,13 +137,28 @@ class ConfigModel(BaseModel):
     ]
     ps_sort_sites: bool = True
     ps_test_timeout: int = 5
+    ps_test_keepalive: float = 300
+    ps_test_keep_warm_interval: float = 0
+    ps_test_http2: bool = False
+    ps_test_cold_delay: bool = False
     # endregion
 
     # region process
     ps_proc_len: int = 5
     ps_ignore_procs: list[str] = ["^System Idle Process$"]
     ps_proc_sort_by: ProcSortByType = "cpu"
+    ps_proc_group_by: ProcGroupByType = "none"
+    ps_proc_extra_columns: list[ProcColumnType] = []
+    ps_proc_scope_cgroup: str | None = None
+    ps_proc_scope_uids: set[int] = set()
+    ps_proc_scope_pid: int | Literal["self"] | None = None
     ps_proc_cpu_max_100p: bool = False
+
+    @field_validator("ps_proc_scope_pid", mode="before")
+    def empty_scope_pid_to_none(cls, v):  # noqa: N805
+        # `PS_PROC_SCOPE_PID=` in .env means not configured
+        return None if v == "" else v
+
     # endregion
     # endregion components
 
@@ -0,0 +1,287 @@
+import asyncio
+import sqlite3
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, NamedTuple, ParamSpec, TypeVar
+
+from nonebot import get_driver, logger
+from nonebot_plugin_apscheduler import scheduler
+
+from .collectors import (
+    BaseNumericMapPeriodicCollector,
+    BaseNumericPeriodicCollector,
+    BasePeriodicCollector,
+    collected_hooks,
+    enabled_collectors,
+    enabled_hooks,
+)
+from .config import HISTORY_DB_PATH, config
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+
+class HistoryTier(NamedTuple):
+    id: int  # noqa: A003
+    bucket: int
+    """bucket size in seconds, 0 means raw samples"""
+    retention: int
+
+
+TIERS = (
+    HistoryTier(0, 0, config.ps_history_raw_retention),
+    HistoryTier(1, 60, config.ps_history_minute_retention),
+    HistoryTier(2, 3600, config.ps_history_hour_retention),
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    tier INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (tier, name, ts)
+) WITHOUT ROWID;
+-- retention deletes by tier and time only
+CREATE INDEX IF NOT EXISTS samples_tier_ts ON samples (tier, ts);
+CREATE TABLE IF NOT EXISTS rollup_state (
+    tier INTEGER PRIMARY KEY,
+    rolled_until INTEGER NOT NULL
+);
+"""
+
+
+def series_name(collector: str, key: str | None = None) -> str:
+    return collector if key is None else f"{collector}/{key}"
+
+
+class HistoryStore:
+    """
+    tiered metric store in SQLite (WAL mode),
+    every database operation runs in a dedicated single thread
+    """
+
+    def __init__(self) -> None:
+        self.executor = ThreadPoolExecutor(1, thread_name_prefix="picstatus_history")
+        self.conn: sqlite3.Connection | None = None
+        self.pending: list[tuple[str, int, float]] = []
+
+    async def _run(self, func: Callable[P, R], *args: P.args, **kwargs: P.kwargs) -> R:
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor,
+            partial(func, *args, **kwargs),
+        )
+
+    def _open(self):
+        HISTORY_DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(HISTORY_DB_PATH, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        self.conn = conn
+
+    def _close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def add(self, name: str, value: float, ts: float | None = None):
+        self.pending.append((name, int(ts or time.time()), float(value)))
+
+    def _rollup(self, conn: sqlite3.Connection, tier: HistoryTier, now: int):
+        source = TIERS[tier.id - 1]
+        row = conn.execute(
+            "SELECT rolled_until FROM rollup_state WHERE tier = ?",
+            (tier.id,),
+        ).fetchone()
+        if row:
+            since = row[0]
+        else:
+            row = conn.execute(
+                "SELECT min(ts) FROM samples WHERE tier = ?",
+                (source.id,),
+            ).fetchone()
+            if (not row) or row[0] is None:
+                return
+            since = row[0] - row[0] % tier.bucket
+        # only roll up buckets that are complete
+        until = now - now % tier.bucket
+        if until <= since:
+            return
+        conn.execute(
+            "INSERT OR REPLACE INTO samples (tier, name, ts, value) "
+            "SELECT ?, name, ts - ts % ?, avg(value) FROM samples "
+            "WHERE tier = ? AND ts >= ? AND ts < ? "
+            "GROUP BY name, ts - ts % ?",
+            (tier.id, tier.bucket, source.id, since, until, tier.bucket),
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO rollup_state (tier, rolled_until) VALUES (?, ?)",
+            (tier.id, until),
+        )
+
+    def _flush(self, pending: list[tuple[str, int, float]]):
+        if not self.conn:
+            self._open()
+        conn = self.conn
+        assert conn
+        now = int(time.time())
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO samples (tier, name, ts, value) "
+                "VALUES (0, ?, ?, ?)",
+                pending,
+            )
+            for tier in TIERS[1:]:
+                self._rollup(conn, tier, now)
+            for tier in TIERS:
+                conn.execute(
+                    "DELETE FROM samples WHERE tier = ? AND ts < ?",
+                    (tier.id, now - tier.retention),
+                )
+
+    async def flush(self):
+        pending, self.pending = self.pending, []
+        try:
+            await self._run(self._flush, pending)
+        except Exception:
+            logger.exception("Error occurred while writing history")
+
+    def _read(
+        self,
+        names: list[str],
+        start: int,
+        end: int,
+        tier: int,
+    ) -> list[tuple[str, int, float]]:
+        if not self.conn:
+            self._open()
+        assert self.conn
+        placeholders = ", ".join("?" * len(names))
+        return self.conn.execute(
+            f"SELECT name, ts, value FROM samples "  # noqa: S608
+            f"WHERE tier = ? AND name IN ({placeholders}) AND ts >= ? AND ts <= ? "
+            f"ORDER BY ts",
+            (tier, *names, start, end),
+        ).fetchall()
+
+    def _read_prefix(
+        self,
+        prefix: str,
+        start: int,
+        tier: int,
+    ) -> list[tuple[str, int, float]]:
+        if not self.conn:
+            self._open()
+        assert self.conn
+        return self.conn.execute(
+            "SELECT name, ts, value FROM samples "
+            "WHERE tier = ? AND name >= ? AND name < ? AND ts >= ? ORDER BY ts",
+            (tier, prefix, f"{prefix}\uffff", start),
+        ).fetchall()
+
+    async def read(
+        self,
+        name: str,
+        start: float,
+        end: float | None = None,
+        tier: int | None = None,
+    ) -> list[tuple[int, float]]:
+        """
+        read samples of a series in time range,
+        finest tier still covering `start` is used when `tier` is not specified
+        """
+        now = time.time()
+        if tier is None:
+            tier = next(
+                (x.id for x in TIERS if now - start <= x.retention),
+                TIERS[-1].id,
+            )
+        rows = await self._run(
+            self._read,
+            [name],
+            int(start),
+            int(end or now),
+            tier,
+        )
+        return [(ts, value) for _, ts, value in rows]
+
+    async def restore(self, name: str, x: BasePeriodicCollector):
+        """fill history buffer of a numeric collector with persisted raw samples"""
+        size = x.data.maxlen or 0
+        if size <= 1:
+            return
+        start = int(time.time() - size * x.collect_interval)
+        if isinstance(x, BaseNumericMapPeriodicCollector):
+            rows = await self._run(self._read_prefix, f"{name}/", start, 0)
+            ticks: dict[int, dict[str, float]] = {}
+            for row_name, ts, value in rows:
+                ticks.setdefault(ts, {})[row_name[len(name) + 1 :]] = value
+            for ts in sorted(ticks)[-size:]:
+                x.data.append(ticks[ts])  # type: ignore
+        else:
+            rows = await self._run(self._read, [name], start, int(time.time()), 0)
+            for _, _, value in rows[-size:]:
+                x.data.append(value)  # type: ignore
+
+    async def close(self):
+        await self.flush()
+        await self._run(self._close)
+        self.executor.shutdown(wait=False)
+
+
+history_store = HistoryStore()
+
+
+def is_numeric_collector(x: Any) -> bool:
+    return isinstance(
+        x,
+        (BaseNumericPeriodicCollector, BaseNumericMapPeriodicCollector),
+    )
+
+
+def record_collected(x: BasePeriodicCollector, data: Any):
+    if isinstance(x, BaseNumericPeriodicCollector):
+        history_store.add(series_name(x.name), data)
+    elif isinstance(x, BaseNumericMapPeriodicCollector):
+        ts = time.time()
+        for k, v in data.items():
+            history_store.add(series_name(x.name, k), v, ts)
+
+
+async def setup_history():
+    if not config.ps_history_enabled:
+        return
+
+    collectors = {
+        k: v for k, v in enabled_collectors.items() if is_numeric_collector(v)
+    }
+    if not collectors:
+        return
+
+    for name, x in collectors.items():
+        try:
+            await history_store.restore(name, x)  # type: ignore
+        except Exception:
+            logger.exception(f"Failed to restore history of collector {name}")
+
+    collected_hooks.append(record_collected)
+    scheduler.add_job(
+        history_store.flush,
+        "interval",
+        seconds=config.ps_history_flush_interval,
+        max_instances=1,
+        coalesce=True,
+    )
+    logger.debug(f"History enabled for {len(collectors)} collectors")
+
+
+enabled_hooks.append(setup_history)
+
+
+@get_driver().on_shutdown
+async def _():
+    if config.ps_history_enabled:
+        await history_store.close()
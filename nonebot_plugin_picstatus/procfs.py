@@ -0,0 +1,227 @@
+"""
+optional Linux backend reading `/proc` directly for raw sources,
+keeps files open and reads them with `preadv` into reused buffers
+"""
+
+import os
+import sys
+import threading
+from typing import NamedTuple
+
+from nonebot import logger
+from psutil._common import scpustats, snetio
+
+from .collectors import raw_source
+
+DISK_SECTOR_SIZE = 512
+
+
+# `psutil._common.sdiskio` only has the generic fields,
+# this has the same fields as `psutil._pslinux.sdiskio`
+class DiskIOCounters(NamedTuple):
+    read_count: int
+    write_count: int
+    read_bytes: int
+    write_bytes: int
+    read_time: int
+    write_time: int
+    read_merged_count: int
+    write_merged_count: int
+    busy_time: int
+
+
+class VirtualMemory(NamedTuple):
+    total: int
+    available: int
+    percent: float
+    used: int
+    free: int
+
+
+class SwapMemory(NamedTuple):
+    total: int
+    used: int
+    free: int
+    percent: float
+
+
+class ProcFile:
+    def __init__(self, path: str, size: int = 8192) -> None:
+        self.path = path
+        self.fd = os.open(path, os.O_RDONLY)
+        self.buf = bytearray(size)
+        # raw sources may be read from different threads of the pool
+        self.lock = threading.Lock()
+
+    def read_lines(self) -> list[bytes]:
+        with self.lock:
+            # seq_file backed files like `/proc/net/dev` return about a page
+            # per read, a short read is not the end of file
+            off = 0
+            while True:
+                if off == len(self.buf):
+                    self.buf.extend(bytes(len(self.buf)))
+                n = os.preadv(self.fd, [memoryview(self.buf)[off:]], off)
+                if not n:
+                    break
+                off += n
+            return bytes(memoryview(self.buf)[:off]).splitlines()
+
+    def close(self):
+        os.close(self.fd)
+
+
+def percent(used: float, total: float) -> float:
+    return round(used / total * 100, 1) if total else 0.0
+
+
+class ProcfsBackend:
+    def __init__(self) -> None:
+        self.stat = ProcFile("/proc/stat")
+        self.meminfo = ProcFile("/proc/meminfo")
+        self.diskstats = ProcFile("/proc/diskstats", 65536)
+        self.net_dev = ProcFile("/proc/net/dev", 65536)
+        self.last_cpu_times: tuple[int, int] | None = None
+
+    def cpu_percent(self) -> float:
+        # same as psutil, busy time excludes idle and iowait,
+        # guest times are already included in user and nice
+        for line in self.stat.read_lines():
+            if line.startswith(b"cpu "):
+                fields = [int(x) for x in line.split()[1:9]]
+                break
+        else:
+            return 0.0
+        total = sum(fields)
+        busy = total - fields[3] - fields[4]
+        last, self.last_cpu_times = self.last_cpu_times, (total, busy)
+        if not last or total <= last[0]:
+            return 0.0
+        return round(max(busy - last[1], 0) / (total - last[0]) * 100, 1)
+
+    def cpu_stats(self) -> scpustats:
+        ctx_switches = interrupts = soft_interrupts = 0
+        for line in self.stat.read_lines():
+            if line.startswith(b"ctxt "):
+                ctx_switches = int(line.split()[1])
+            elif line.startswith(b"intr "):
+                interrupts = int(line.split(maxsplit=2)[1])
+            elif line.startswith(b"softirq "):
+                soft_interrupts = int(line.split(maxsplit=2)[1])
+        return scpustats(ctx_switches, interrupts, soft_interrupts, 0)
+
+    def _meminfo(self) -> dict[bytes, int]:
+        res: dict[bytes, int] = {}
+        for line in self.meminfo.read_lines():
+            key, _, value = line.partition(b":")
+            res[key] = int(value.split(maxsplit=1)[0]) * 1024
+        return res
+
+    def virtual_memory(self) -> VirtualMemory:
+        info = self._meminfo()
+        total = info.get(b"MemTotal", 0)
+        free = info.get(b"MemFree", 0)
+        cached = info.get(b"Cached", 0) + info.get(b"SReclaimable", 0)
+        buffers = info.get(b"Buffers", 0)
+        available = info.get(b"MemAvailable", free + cached + buffers)
+        used = total - free - cached - buffers
+        if used < 0:
+            used = total - free
+        return VirtualMemory(
+            total=total,
+            available=available,
+            percent=percent(total - available, total),
+            used=used,
+            free=free,
+        )
+
+    def swap_memory(self) -> SwapMemory:
+        info = self._meminfo()
+        total = info.get(b"SwapTotal", 0)
+        free = info.get(b"SwapFree", 0)
+        used = total - free
+        return SwapMemory(
+            total=total,
+            used=used,
+            free=free,
+            percent=percent(used, total),
+        )
+
+    def disk_io_counters(self) -> dict[str, DiskIOCounters]:
+        res: dict[str, DiskIOCounters] = {}
+        for line in self.diskstats.read_lines():
+            fields = line.split()
+            if len(fields) < 14:
+                continue
+            (
+                reads,
+                reads_merged,
+                read_sectors,
+                read_time,
+                writes,
+                writes_merged,
+                write_sectors,
+                write_time,
+                _,
+                busy_time,
+            ) = map(int, fields[3:13])
+            res[fields[2].decode()] = DiskIOCounters(
+                read_count=reads,
+                write_count=writes,
+                read_bytes=read_sectors * DISK_SECTOR_SIZE,
+                write_bytes=write_sectors * DISK_SECTOR_SIZE,
+                read_time=read_time,
+                write_time=write_time,
+                read_merged_count=reads_merged,
+                write_merged_count=writes_merged,
+                busy_time=busy_time,
+            )
+        return res
+
+    def net_io_counters(self) -> dict[str, snetio]:
+        res: dict[str, snetio] = {}
+        # first two lines are headers
+        for line in self.net_dev.read_lines()[2:]:
+            name, _, data = line.partition(b":")
+            fields = data.split()
+            res[name.strip().decode()] = snetio(
+                bytes_sent=int(fields[8]),
+                bytes_recv=int(fields[0]),
+                packets_sent=int(fields[9]),
+                packets_recv=int(fields[1]),
+                errin=int(fields[2]),
+                errout=int(fields[10]),
+                dropin=int(fields[3]),
+                dropout=int(fields[11]),
+            )
+        return res
+
+
+def setup_procfs_backend() -> bool:
+    if not sys.platform.startswith("linux"):
+        logger.warning("Procfs backend is only available on Linux, ignored")
+        return False
+    try:
+        backend = ProcfsBackend()
+    except OSError as e:
+        logger.warning(f"Failed to open procfs files, procfs backend disabled: {e}")
+        return False
+
+    sources = {
+        "cpu_percent": backend.cpu_percent,
+        "cpu_stats": backend.cpu_stats,
+        "virtual_memory": backend.virtual_memory,
+        "swap_memory": backend.swap_memory,
+        "disk_io_counters": backend.disk_io_counters,
+        "net_io_counters": backend.net_io_counters,
+    }
+    for name, func in sources.items():
+        # make sure every method works on this kernel before replacing psutil
+        try:
+            func()
+        except Exception as e:
+            logger.warning(f"Procfs backend failed to read {name}, using psutil: {e!r}")
+            continue
+        raw_source(name, blocking=False, override=True)(func)
+    logger.debug("Procfs backend enabled")
+    return True
@@ -0,0 +1,186 @@
+import math
+from array import array
+from collections.abc import Iterable, Iterator
+from typing import overload
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class NumericRingBuffer:
+    """
+    fixed size numeric time series backed by `array`,
+    indexing and iterating order is the same as `deque` (oldest first)
+    """
+
+    def __init__(self, size: int, typecode: str = "d") -> None:
+        if size < 1:
+            raise ValueError("size must be greater than or equals 1")
+        self.size = size
+        self._buf = array(typecode, [0] * size)
+        self._start = 0
+        self._len = 0
+
+    @property
+    def maxlen(self) -> int:
+        return self.size
+
+    def append(self, value: float):
+        end = (self._start + self._len) % self.size
+        self._buf[end] = value
+        if self._len < self.size:
+            self._len += 1
+        else:
+            self._start = (self._start + 1) % self.size
+
+    def extend(self, values: Iterable[float]):
+        for x in values:
+            self.append(x)
+
+    def clear(self):
+        self._start = 0
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __bool__(self) -> bool:
+        return self._len > 0
+
+    @overload
+    def __getitem__(self, index: int) -> float: ...
+    @overload
+    def __getitem__(self, index: slice) -> list[float]: ...
+    def __getitem__(self, index: int | slice) -> float | list[float]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._len))]
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("ring buffer index out of range")
+        return self._buf[(self._start + index) % self.size]
+
+    def __iter__(self) -> Iterator[float]:
+        return (self[i] for i in range(self._len))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({list(self)}, size={self.size})"
+
+    @property
+    def latest(self) -> float | None:
+        return self[-1] if self._len else None
+
+    def _segments(self, window: int | None = None) -> list[array]:
+        """slices of the underlying buffer covering the last `window` items"""
+        count = self._len if window is None else max(min(window, self._len), 0)
+        if not count:
+            return []
+        begin = (self._start + self._len - count) % self.size
+        end = begin + count
+        if end <= self.size:
+            return [self._buf[begin:end]]
+        return [self._buf[begin:], self._buf[: end - self.size]]
+
+    def window(self, window: int | None = None) -> array:
+        """copy of the last `window` items in order, all items if `window` is None"""
+        segments = self._segments(window)
+        res = array(self._buf.typecode)
+        for x in segments:
+            res.extend(x)
+        return res
+
+    def _values(self, window: int | None):
+        values = self.window(window)
+        if np is not None:
+            return np.frombuffer(values, dtype=values.typecode)
+        return values
+
+    def min(self, window: int | None = None) -> float | None:  # noqa: A003
+        values = self._values(window)
+        if not len(values):
+            return None
+        return float(values.min() if np is not None else min(values))
+
+    def max(self, window: int | None = None) -> float | None:  # noqa: A003
+        values = self._values(window)
+        if not len(values):
+            return None
+        return float(values.max() if np is not None else max(values))
+
+    def mean(self, window: int | None = None) -> float | None:
+        values = self._values(window)
+        if not len(values):
+            return None
+        return float(values.mean() if np is not None else sum(values) / len(values))
+
+    def percentile(self, q: float, window: int | None = None) -> float | None:
+        """q is in range 0 ~ 100, uses linear interpolation like numpy"""
+        values = self._values(window)
+        if not len(values):
+            return None
+        if np is not None:
+            return float(np.percentile(values, q))
+        ordered = sorted(values)
+        pos = (len(ordered) - 1) * q / 100
+        low = math.floor(pos)
+        high = math.ceil(pos)
+        return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+class NumericSeriesMap:
+    """
+    keyed group of `NumericRingBuffer`s, e.g. rate of every NIC,
+    keys not appeared in the last `size` appends will be dropped
+    """
+
+    def __init__(self, size: int, typecode: str = "d") -> None:
+        self.size = size
+        self.typecode = typecode
+        self.series: dict[str, NumericRingBuffer] = {}
+        self._last_seen: dict[str, int] = {}
+        self._tick = 0
+
+    @property
+    def maxlen(self) -> int:
+        return self.size
+
+    def append(self, values: dict[str, float]):
+        self._tick += 1
+        for k, v in values.items():
+            if k not in self.series:
+                self.series[k] = NumericRingBuffer(self.size, self.typecode)
+            self.series[k].append(v)
+            self._last_seen[k] = self._tick
+        outdated = [
+            k for k, t in self._last_seen.items() if self._tick - t >= self.size
+        ]
+        for k in outdated:
+            del self.series[k]
+            del self._last_seen[k]
+
+    def __len__(self) -> int:
+        return len(self.series)
+
+    def __bool__(self) -> bool:
+        return bool(self.series)
+
+    def __getitem__(self, key: str) -> NumericRingBuffer:
+        return self.series[key]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.series
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.series)
+
+    def items(self):
+        return self.series.items()
+
+    def latest(self) -> dict[str, float]:
+        return {
+            k: v
+            for k, x in self.series.items()
+            if self._last_seen[k] == self._tick and (v := x.latest) is not None
+        }
@@ -16,6 +16,8 @@ if TYPE_CHECKING:
 class TemplateRendererKwargs(TypedDict):
     collected: dict[str, Any]
     bg: "BgBytesData"
+    stale: set[str]
+    """names of collectors timed out, their data in `collected` is from before"""
 
 
 class TemplateRenderer(Protocol):
@@ -56,6 +56,7 @@ COMPONENT_COLLECTORS = {
     "disk": {"disk_usage", "disk_io"},
     "network": {"network_io", "network_connection"},
     "process": {"process_status"},
+    "self": {"self_status"},
     "footer": {
         "nonebot_version",
         "ps_version",
@@ -74,6 +75,7 @@ PERIODIC_COLLECTORS_MAP = {
     "time": "time_periodic",
     "network_io": "network_io_periodic",
     "process_status": "process_status_periodic",
+    "self_status": "self_status_periodic",
 }
 PERIODIC_COLLECTORS_MAP_REVERSE = {v: k for k, v in PERIODIC_COLLECTORS_MAP.items()}
 
@@ -91,6 +93,7 @@ class TemplateConfig(BaseModel):
     ps_default_additional_script: list[str] = []
     ps_default_pic_format: Literal["jpeg", "png"] = "jpeg"
     ps_default_use_periodic: bool = True
+    ps_default_disk_io_details: bool = False
 
     @field_validator("ps_default_additional_css")
     def resolve_css_url(cls, v: list[str]):  # noqa: N805
@@ -110,7 +113,13 @@ if template_config.ps_default_use_periodic:
 
 
 @pic_template(collecting=collecting)
-async def default(collected: dict[str, Any], bg: "BgBytesData", **_) -> bytes:
+async def default(
+    collected: dict[str, Any],
+    bg: "BgBytesData",
+    stale: set[str],
+    **_,
+) -> bytes:
+    stale = {PERIODIC_COLLECTORS_MAP_REVERSE.get(x, x) for x in stale}
     for k, v in collected.copy().items():
         if (
             template_config.ps_default_use_periodic
@@ -119,10 +128,14 @@ async def default(collected: dict[str, Any], bg: "BgBytesData", **_) -> bytes:
             del collected[k]
             k = PERIODIC_COLLECTORS_MAP_REVERSE[k]
         if isinstance(v, deque):
-            collected[k] = v[0]
+            collected[k] = v[0] if v else None
 
     template = ENVIRONMENT.get_template("index.html.jinja")
-    html = await template.render_async(d=collected, config=template_config)
+    html = await template.render_async(
+        d=collected,
+        config=template_config,
+        stale=stale,
+    )
 
     if debug.enabled:
         debug.write(html, "default_{time}.html")
@@ -1,13 +1,17 @@
+import heapq
 import re
-from functools import partial
+from collections.abc import Callable, Sequence
+from functools import cache, partial
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any, TypeVar
 
 from cookit import DebugFileWriter, auto_convert_byte, format_timedelta
 
 if TYPE_CHECKING:
     from .collectors.cpu import CpuFreq
 
+T = TypeVar("T")
+
 format_time_delta_ps = partial(format_timedelta, day_divider=" ", day_suffix="天")
 
 
@@ -15,6 +19,43 @@ def match_list_regexp(reg_list: list[str], txt: str) -> re.Match | None:
     return next((match for r in reg_list if (match := re.search(r, txt))), None)
 
 
+@cache
+def compile_list_regexp(reg_list: tuple[str, ...]) -> tuple[re.Pattern, ...]:
+    return tuple(re.compile(x) for x in reg_list)
+
+
+def match_compiled_list(
+    patterns: tuple[re.Pattern, ...],
+    txt: str,
+) -> re.Match | None:
+    return next((match for r in patterns if (match := r.search(txt))), None)
+
+
+@cache
+def compile_group_regexp(
+    groups: tuple[tuple[str, str], ...],
+) -> tuple[tuple[str, re.Pattern], ...]:
+    return tuple((name, re.compile(x)) for name, x in groups)
+
+
+def match_group(groups: tuple[tuple[str, re.Pattern], ...], txt: str) -> str | None:
+    return next((name for name, r in groups if r.search(txt)), None)
+
+
+def top_n(
+    items: Sequence[T],
+    n: int,
+    key: Callable[[T], Any],
+    sort: bool = True,
+) -> list[T]:
+    """largest n items by key (n <= 0 means no limit), order kept when not sorting"""
+    if not sort:
+        return list(items[:n] if n > 0 else items)
+    if n > 0:
+        return heapq.nlargest(n, items, key=key)
+    return sorted(items, key=key, reverse=True)
+
+
 def format_cpu_freq(freq: "CpuFreq") -> str:
     cu = partial(auto_convert_byte, suffix="Hz", unit_index=2, with_space=False)
     if not freq.current: